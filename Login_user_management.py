@@ -5,7 +5,7 @@ import hashlib
 from email.message import EmailMessage
 import smtplib
 import random
-from testquery import DB_HOST, DB_PORT, DB_SID, DB_USER, DB_PASSWORD
+from db_utils import get_db_connection
 
 # Session state defaults
 if "logged_in" not in st.session_state:
@@ -55,9 +55,9 @@ def signup_user(username, password, role, email):
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
-# DB connection
+# DB connection (pooled; close() hands it back to the pool)
 def create_connection():
-    return oracledb.connect(user=DB_USER, password=DB_PASSWORD, dsn=DSN)
+    return get_db_connection()
 
 
 # --- pwermission ---
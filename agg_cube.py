@@ -0,0 +1,248 @@
+import os
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+from db_utils import DatabaseConnection, close_pool
+import fy_registry
+import schema_catalog
+import sql_templates
+import fanout
+
+# --- Cube Settings ---
+# Monthly aggregates of every fiscal-year table at (GRP, YYMM, ZONE_FRM) grain,
+# stored in the connecting user's schema (next to DATA_STORE).
+CUBE_TABLE = "CARR_APMT_MONTHLY_AGG"
+# auto   - answer from the cube when it holds every requested fiscal year, else raw tables
+# raw    - always scan the raw CARR_APMT_EXCL_ADV_* tables
+# verify - answer from the cube and re-run against the raw tables, reporting differences
+CUBE_MODE = os.getenv("AGG_CUBE_MODE", "auto")
+# Built-year lookups are cached this long (seconds)
+CUBE_STATUS_TTL = 60
+
+# Measure -> raw expression and the raw columns it needs
+MEASURES = {
+    "CHBL_WGHT": {"expr": "TO_NUMBER(CHBL_WGHT)", "columns": ["CHBL_WGHT"]},
+    "FREIGHT": {"expr": "TOT_FRT_INCL_GST - TOT_GST", "columns": ["TOT_FRT_INCL_GST", "TOT_GST"]},
+    "WR": {"expr": "TO_NUMBER(WR)", "columns": ["WR"]},
+    "TOT_GST": {"expr": "TOT_GST", "columns": ["TOT_GST"]},
+}
+
+_status_lock = threading.Lock()
+_status = {"built": frozenset(), "checked_at": 0.0}
+
+# ------------------- Build -------------------
+
+def ensure_cube_table(cursor):
+    cursor.execute("SELECT table_name FROM user_tables WHERE table_name = :name", name=CUBE_TABLE)
+    if cursor.fetchone():
+        return
+    cursor.execute(f"""
+        CREATE TABLE {CUBE_TABLE} (
+            fy_suffix VARCHAR2(5) NOT NULL,
+            grp VARCHAR2(20),
+            yymm NUMBER(6) NOT NULL,
+            zone_frm VARCHAR2(20),
+            chbl_wght NUMBER,
+            freight NUMBER,
+            wr NUMBER,
+            tot_gst NUMBER,
+            row_count NUMBER,
+            refreshed_at TIMESTAMP DEFAULT SYSTIMESTAMP
+        )
+    """)
+    cursor.execute(f"CREATE INDEX idx_{CUBE_TABLE}_fy ON {CUBE_TABLE}(fy_suffix, yymm)")
+
+def raw_expr(measure, table):
+    """Raw expression for a measure, or NULL when the table lacks one of its columns."""
+    spec = MEASURES[measure]
+    if all(schema_catalog.has_column(table, col) for col in spec["columns"]):
+        return spec["expr"]
+    return "NULL"
+
+def aggregate_select(table, where=""):
+    """SELECT producing cube rows (minus fy_suffix) for one raw fiscal-year table."""
+    sums = ", ".join(f"SUM({raw_expr(m, table)}) AS {m}" for m in MEASURES)
+    return f"""
+        SELECT grp, TO_NUMBER(yymm) AS yymm, zone_frm, {sums}, COUNT(*) AS row_count
+        FROM {table}
+        {where}
+        GROUP BY grp, TO_NUMBER(yymm), zone_frm
+    """
+
+def build_year(cursor, fy):
+    """Replace the cube rows of one fiscal year with a fresh aggregate of its raw table."""
+    cursor.execute(f"DELETE FROM {CUBE_TABLE} WHERE fy_suffix = :fy", fy=fy["suffix"])
+    cursor.execute(f"""
+        INSERT INTO {CUBE_TABLE} (fy_suffix, grp, yymm, zone_frm, chbl_wght, freight, wr, tot_gst, row_count)
+        SELECT :fy, agg.* FROM ({aggregate_select(fy["table"])}) agg
+    """, fy=fy["suffix"])
+    return cursor.rowcount
+
+def build_month(cursor, fy, yymm):
+    """Replace the cube rows of a single YYYYMM month of one fiscal year."""
+    cursor.execute(f"DELETE FROM {CUBE_TABLE} WHERE fy_suffix = :fy AND yymm = :yymm", fy=fy["suffix"], yymm=yymm)
+    cursor.execute(f"""
+        INSERT INTO {CUBE_TABLE} (fy_suffix, grp, yymm, zone_frm, chbl_wght, freight, wr, tot_gst, row_count)
+        SELECT :fy, agg.* FROM ({aggregate_select(fy["table"], "WHERE yymm = :yymm")}) agg
+    """, fy=fy["suffix"], yymm=yymm)
+    return cursor.rowcount
+
+def build_cube(suffixes=None):
+    """Build (or rebuild) the cube for the given fiscal-year suffixes, default all."""
+    years = [fy for fy in fy_registry.fiscal_years() if suffixes is None or fy["suffix"] in suffixes]
+    with DatabaseConnection() as conn:
+        cursor = conn.cursor()
+        ensure_cube_table(cursor)
+        for fy in years:
+            start = time.perf_counter()
+            rows = build_year(cursor, fy)
+            conn.commit()
+            print(f"{fy['table']}: {rows} cube rows in {time.perf_counter() - start:.1f}s")
+        cursor.close()
+    invalidate_status()
+    import result_cache
+    result_cache.invalidate([fy["suffix"] for fy in years])
+
+# ------------------- Query layer -------------------
+
+def invalidate_status():
+    with _status_lock:
+        _status["checked_at"] = 0.0
+
+def built_suffixes(conn):
+    """Fiscal years currently present in the cube (empty if the cube was never built)."""
+    with _status_lock:
+        if time.monotonic() - _status["checked_at"] < CUBE_STATUS_TTL:
+            return _status["built"]
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SELECT DISTINCT fy_suffix FROM {CUBE_TABLE}")
+            built = frozenset(row[0] for row in cursor)
+        except Exception:
+            built = frozenset()  # ORA-00942: cube not built yet
+        finally:
+            cursor.close()
+        _status["built"] = built
+        _status["checked_at"] = time.monotonic()
+        return built
+
+# Row-source filters pushed into every branch, on the native (NUMBER) YYMM column:
+#   {"yymm": (201904, 202503), "grp": ["01", "02"], "zone_frm": "WR"}
+# Every key is optional. Pages keep their own CASE/WHERE logic; these only narrow the scan.
+# Values go in as bind variables (see sql_templates.Binds) so the SQL text stays stable.
+
+def pushdown_conditions(filters, binds, yymm_as_text=False):
+    """Sargable predicates for a row-source branch (empty list when nothing to push)."""
+    conds = []
+    if filters.get("yymm"):
+        start, end = (int(v) for v in filters["yymm"])
+        if yymm_as_text:
+            start, end = str(start), str(end)
+        conds.append(f"YYMM BETWEEN {binds(start)} AND {binds(end)}")
+    if filters.get("grp"):
+        conds.append(f"GRP IN ({binds.in_list(filters['grp'])})")
+    if filters.get("zone_frm"):
+        conds.append(f"ZONE_FRM = {binds(filters['zone_frm'])}")
+    return conds
+
+def prune_suffixes(suffixes, filters):
+    """Drop fiscal years whose April..March span cannot meet the filtered YYMM range."""
+    if not filters.get("yymm"):
+        return list(suffixes)
+    start, end = (int(v) for v in filters["yymm"])
+    years = {fy["suffix"]: fy for fy in fy_registry.fiscal_years()}
+    kept = [s for s in suffixes if years[s]["first_yymm"] <= end and years[s]["last_yymm"] >= start]
+    # Nothing can match: keep one branch so the page still gets an (empty) well-formed result
+    return kept or list(suffixes)[:1]
+
+def source_sql(measures, suffixes, use_cube, filters=None, binds=None):
+    """Row source with FY_SUFFIX, GRP, YYMM (as text), ZONE_FRM and one column per measure.
+
+    measures maps output alias -> MEASURES key, e.g. {"VALUE": "CHBL_WGHT"}.
+    Page queries only SUM these columns, so the cube and the raw tables give the same answer.
+    filters (see pushdown_conditions) are applied inside each branch, before TO_CHAR(YYMM);
+    their values are added to binds.
+    """
+    filters = filters or {}
+    binds = binds if binds is not None else sql_templates.Binds("f")
+    suffixes = prune_suffixes(suffixes, filters)
+    if use_cube:
+        cols = ", ".join(f"{m} AS {alias}" for alias, m in measures.items())
+        where = " AND ".join([f"FY_SUFFIX IN ({binds.in_list(suffixes)})"] + pushdown_conditions(filters, binds))
+        return f"SELECT FY_SUFFIX, GRP, TO_CHAR(YYMM) AS YYMM, ZONE_FRM, {cols} FROM {CUBE_TABLE} WHERE {where}"
+    conds = pushdown_conditions(filters, binds)
+    where = f" WHERE {' AND '.join(conds)}" if conds else ""
+    branches = []
+    for suffix in suffixes:
+        table = fy_registry.get(suffix)["table"]
+        cols = ", ".join(f"{raw_expr(m, table)} AS {alias}" for alias, m in measures.items())
+        branches.append(f"SELECT '{suffix}' AS FY_SUFFIX, GRP, TO_CHAR(YYMM) AS YYMM, ZONE_FRM, {cols} FROM {table}{where}")
+    return "\n            UNION ALL ".join(branches)
+
+def compare_frames(cube_df, raw_df, rtol=1e-9, atol=1e-6):
+    """Number of cells where two page results disagree (shape/column differences count as all)."""
+    if list(cube_df.columns) != list(raw_df.columns) or len(cube_df) != len(raw_df):
+        return max(cube_df.size, raw_df.size, 1)
+    mismatches = 0
+    for col in cube_df.columns:
+        a, b = cube_df[col], raw_df[col]
+        if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+            mismatches += int((~np.isclose(a.fillna(0), b.fillna(0), rtol=rtol, atol=atol)).sum())
+        else:
+            mismatches += int((a.astype(str) != b.astype(str)).sum())
+    return mismatches
+
+def _run(conn, build_query, measures, suffixes, use_cube, filters, params):
+    binds = sql_templates.Binds("f")
+    sql = build_query(source_sql(measures, suffixes, use_cube, filters, binds))
+    return sql_templates.read_sql(sql, conn, {**(params or {}), **binds.values})
+
+def read_sql(conn, build_query, measures, suffixes, filters=None, params=None):
+    """Run a page query against the cube when possible, falling back to the raw tables.
+
+    build_query(source) must return the page SQL for a given row source (see source_sql);
+    params holds the page's own bind values (see sql_templates.Binds).
+    """
+    use_cube = CUBE_MODE != "raw" and set(suffixes) <= built_suffixes(conn)
+    df = _run(conn, build_query, measures, suffixes, use_cube, filters, params)
+    if CUBE_MODE == "verify" and use_cube:
+        raw_df = _run(conn, build_query, measures, suffixes, False, filters, params)
+        mismatches = compare_frames(df, raw_df)
+        if mismatches:
+            print(f"⚠️ Cube verification: {mismatches} cells differ from raw tables for {sorted(suffixes)}")
+    return df
+
+def verify_cube(suffixes=None):
+    """Compare per-year measure totals in the cube against a scan of each raw table.
+
+    The raw-table scans are independent, so they run concurrently (see fanout).
+    """
+    years = [fy for fy in fy_registry.fiscal_years() if suffixes is None or fy["suffix"] in suffixes]
+
+    def check(conn, fy):
+        raw_sums = ", ".join(f"SUM({raw_expr(m, fy['table'])}) AS {m}" for m in MEASURES)
+        raw = sql_templates.read_sql(f"SELECT {raw_sums}, COUNT(*) AS ROW_COUNT FROM {fy['table']}", conn)
+        cube_sums = ", ".join(f"SUM({m}) AS {m}" for m in MEASURES)
+        cube = sql_templates.read_sql(
+            f"SELECT {cube_sums}, SUM(row_count) AS ROW_COUNT FROM {CUBE_TABLE} WHERE fy_suffix = :fy",
+            conn, {"fy": fy["suffix"]}
+        )
+        return {"fy": fy["suffix"], "mismatched_measures": compare_frames(cube, raw)}
+
+    return pd.DataFrame(fanout.fan_out(check, years))
+
+if __name__ == "__main__":
+    # python agg_cube.py build [24_25 25_26 ...] | verify [24_25 ...]
+    if len(sys.argv) < 2 or sys.argv[1] not in ("build", "verify"):
+        print("Usage: python agg_cube.py build|verify [fiscal-year suffix ...]")
+        sys.exit(1)
+    selected = sys.argv[2:] or None
+    try:
+        if sys.argv[1] == "build":
+            build_cube(selected)
+        else:
+            print(verify_cube(selected).to_string(index=False))
+    finally:
+        close_pool()
@@ -0,0 +1,285 @@
+import os
+import sys
+import threading
+import time
+import pandas as pd
+
+# --- Columnar Fetch ---
+# python-oracledb 3.x can fetch straight into Arrow columns (connection.fetch_df_all /
+# fetch_df_batches): numbers arrive as int64/float64 arrays and no Python tuple is built
+# per row. pd.read_sql on a raw oracledb connection goes through pandas' DBAPI fallback
+# (fetchall into tuples, then object columns inferred row by row).
+#
+# Older drivers, connections without the methods (the SQLite snapshot) and installs
+# without pyarrow fall back to cursor.fetchmany; the result has the same columns.
+
+# --- Fetch Profiles ---
+# Callers say what shape of result they expect and the round-trip sizes follow:
+#   aggregate - page queries, a few to a few hundred rows: one round trip
+#               (prefetchrows = arraysize + 1 lets the execute call return everything)
+#   preview   - on-screen tables of up to a few thousand rows
+#   bulk      - exports and loaders pulling millions of rows: large batches, no prefetch
+FETCH_PROFILES = {
+    "aggregate": {"arraysize": 500, "prefetchrows": 501},
+    "preview": {"arraysize": 2000, "prefetchrows": 2001},
+    "bulk": {"arraysize": int(os.getenv("FETCH_BULK_ROWS", 100_000)), "prefetchrows": 2},
+}
+# Auto-tuning: remember the rows each statement returned and size later executions of
+# the same statement from that. It only ever shrinks a fetch: the profile's arraysize
+# above stays the ceiling, so a tuned bulk fetch never buffers more rows than configured.
+FETCH_AUTOTUNE = os.getenv("FETCH_AUTOTUNE", "1") == "1"
+FETCH_AUTOTUNE_MIN = 16
+
+_support = {"arrow": None}
+_lock = threading.Lock()
+_observed = {}    # statement id -> largest row count returned so far
+_row_only = set()    # statement ids the driver refused to fetch columnar (DPY-3xxx)
+
+def _statement_key(sql):
+    import sql_templates
+    return sql_templates.sql_id(sql)
+
+def fetch_sizes(profile, sql=None):
+    """(arraysize, prefetchrows) for a statement run under profile."""
+    sizes = FETCH_PROFILES[profile]
+    arraysize, prefetchrows = sizes["arraysize"], sizes["prefetchrows"]
+    if FETCH_AUTOTUNE and sql is not None:
+        with _lock:
+            seen = _observed.get(_statement_key(sql))
+        if seen is not None:
+            # Smallest power of two holding the whole result seen so far (capped at the
+            # profile's arraysize), so a repeat of a small lookup allocates little
+            ceiling = arraysize
+            arraysize = FETCH_AUTOTUNE_MIN
+            while arraysize <= seen and arraysize < ceiling:
+                arraysize *= 2
+            arraysize = min(arraysize, ceiling)
+            # Prefetch only pays off when the whole result fits in the first round trip
+            prefetchrows = arraysize + 1 if profile != "bulk" else 2
+    return arraysize, prefetchrows
+
+def record_rows(sql, rows):
+    """Feed the auto-tuner the row count a statement just returned."""
+    if not FETCH_AUTOTUNE:
+        return
+    key = _statement_key(sql)
+    with _lock:
+        _observed[key] = max(rows, _observed.get(key, 0))
+
+def configure(cursor, profile, sql=None):
+    """Set arraysize/prefetchrows on a cursor before executing sql on it."""
+    cursor.arraysize, prefetchrows = fetch_sizes(profile, sql)
+    if hasattr(cursor, "prefetchrows"):
+        cursor.prefetchrows = prefetchrows
+    return cursor
+
+def tuning_stats():
+    """Statements the auto-tuner has seen and the largest result of each."""
+    with _lock:
+        return dict(_observed)
+
+def arrow_supported(conn):
+    """True when conn can fetch DataFrames and pyarrow is installed."""
+    if not hasattr(conn, "fetch_df_all"):
+        return False
+    if _support["arrow"] is None:
+        try:
+            import pyarrow  # noqa: F401
+            _support["arrow"] = True
+        except ImportError:
+            _support["arrow"] = False
+    return _support["arrow"]
+
+def _to_arrow(odf):
+    import pyarrow as pa
+    try:
+        return pa.table(odf)    # Arrow PyCapsule interface (python-oracledb 3.1+)
+    except TypeError:
+        return pa.Table.from_arrays(odf.column_arrays(), names=odf.column_names())
+
+def _to_pandas(odf):
+    return _to_arrow(odf).to_pandas()
+
+def _not_supported(e):
+    # DPY-3xxx: feature not supported by this driver mode / database version
+    return "DPY-3" in str(e)
+
+def _columnar(conn, sql):
+    # A DPY-3xxx refusal is usually about one statement's column types (e.g. a LOB),
+    # so only that statement falls back to row fetches; everything else stays columnar
+    if not arrow_supported(conn):
+        return False
+    with _lock:
+        return _statement_key(sql) not in _row_only
+
+def _fall_back(sql):
+    with _lock:
+        _row_only.add(_statement_key(sql))
+
+def _cursor_batches(conn, sql, params, profile, size=None):
+    cursor = conn.cursor()
+    try:
+        configure(cursor, profile, sql)
+        size = size or cursor.arraysize
+        cursor.execute(sql, params or {})
+        cols = [col[0] for col in cursor.description]
+        empty = True
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                break
+            empty = False
+            yield pd.DataFrame.from_records(rows, columns=cols)
+        if empty:
+            yield pd.DataFrame(columns=cols)
+    finally:
+        cursor.close()
+
+def _arrow_type(column):
+    """Arrow type for a cursor.description entry, from the column's declared Oracle type."""
+    import oracledb
+    import pyarrow as pa
+    type_code, precision, scale = column[1], column[4], column[5]
+    if type_code is oracledb.DB_TYPE_NUMBER:
+        # Same rule as the driver's own Arrow fetch: exact integers fit int64 up to 18 digits
+        return pa.int64() if scale == 0 and precision and precision <= 18 else pa.float64()
+    for db_types, arrow_type in (
+        ((oracledb.DB_TYPE_BINARY_FLOAT, oracledb.DB_TYPE_BINARY_DOUBLE), pa.float64()),
+        ((oracledb.DB_TYPE_BINARY_INTEGER,), pa.int64()),
+        ((oracledb.DB_TYPE_DATE, oracledb.DB_TYPE_TIMESTAMP, oracledb.DB_TYPE_TIMESTAMP_LTZ, oracledb.DB_TYPE_TIMESTAMP_TZ), pa.timestamp("us")),
+        ((oracledb.DB_TYPE_RAW, oracledb.DB_TYPE_LONG_RAW, oracledb.DB_TYPE_BLOB), pa.large_binary()),
+        ((oracledb.DB_TYPE_BOOLEAN,), pa.bool_()),
+    ):
+        if type_code in db_types:
+            return arrow_type
+    return pa.large_string()
+
+def _arrow_column(values, arrow_type):
+    import pyarrow as pa
+    if pa.types.is_large_string(arrow_type) or pa.types.is_large_binary(arrow_type):
+        # LOB locators are read here; anything else without an Arrow mapping becomes text
+        values = [v.read() if hasattr(v, "read") else v for v in values]
+        if pa.types.is_large_string(arrow_type):
+            values = [v if v is None or isinstance(v, str) else str(v) for v in values]
+    return pa.array(values, type=arrow_type)
+
+def _cursor_tables(conn, sql, params, profile, size=None):
+    import pyarrow as pa
+    cursor = conn.cursor()
+    try:
+        configure(cursor, profile, sql)
+        size = size or cursor.arraysize
+        cursor.execute(sql, params or {})
+        schema = pa.schema([(col[0], _arrow_type(col)) for col in cursor.description])
+        empty = True
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                break
+            empty = False
+            columns = zip(*rows)
+            yield pa.Table.from_arrays([_arrow_column(list(values), field.type) for values, field in zip(columns, schema)], schema=schema)
+        if empty:
+            yield schema.empty_table()
+    finally:
+        cursor.close()
+
+def read_df(sql, conn, params=None, profile="aggregate"):
+    """Whole result set as one DataFrame, columnar when the driver supports it."""
+    df = None
+    if _columnar(conn, sql):
+        try:
+            arraysize, _ = fetch_sizes(profile, sql)
+            df = _to_pandas(conn.fetch_df_all(statement=sql, parameters=params or None, arraysize=arraysize))
+        except Exception as e:
+            if not _not_supported(e):
+                raise
+            _fall_back(sql)
+    if df is None:
+        frames = list(_cursor_batches(conn, sql, params, profile))
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    record_rows(sql, len(df))
+    return df
+
+def iter_batches(sql, conn, params=None, profile="bulk", size=None):
+    """Result set as a sequence of DataFrames of up to size rows (default: the profile's arraysize)."""
+    size = size or fetch_sizes(profile, sql)[0]
+    rows = 0
+    if _columnar(conn, sql):
+        try:
+            batches = conn.fetch_df_batches(statement=sql, parameters=params or None, size=size)
+            for odf in batches:
+                df = _to_pandas(odf)
+                rows += len(df)
+                yield df
+            record_rows(sql, rows)
+            return
+        except Exception as e:
+            if rows or not _not_supported(e):
+                raise
+            _fall_back(sql)
+    for df in _cursor_batches(conn, sql, params, profile, size):
+        rows += len(df)
+        yield df
+    record_rows(sql, rows)
+
+def iter_arrow_batches(sql, conn, params=None, profile="bulk", size=None):
+    """Result set as pyarrow Tables of up to size rows, for writers that take Arrow directly.
+
+    Column types come from the statement's metadata rather than the values, so every
+    batch has the same schema even where a column is all NULL in some of them.
+    """
+    size = size or fetch_sizes(profile, sql)[0]
+    rows = 0
+    if _columnar(conn, sql):
+        try:
+            batches = conn.fetch_df_batches(statement=sql, parameters=params or None, size=size)
+            for odf in batches:
+                table = _to_arrow(odf)
+                rows += table.num_rows
+                yield table
+            record_rows(sql, rows)
+            return
+        except Exception as e:
+            if rows or not _not_supported(e):
+                raise
+            _fall_back(sql)
+    for table in _cursor_tables(conn, sql, params, profile, size):
+        rows += table.num_rows
+        yield table
+    record_rows(sql, rows)
+
+# ------------------- Benchmark -------------------
+
+def _frame_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
+
+def benchmark(table, rows=1_000_000):
+    """Time the row-tuple path (pd.read_sql) against the columnar path on the first rows of table."""
+    from db_utils import DatabaseConnection
+    sql = f"SELECT * FROM {table} WHERE ROWNUM <= :n"
+    with DatabaseConnection() as conn:
+        start = time.perf_counter()
+        tuples_df = pd.read_sql(sql, con=conn, params={"n": rows})
+        tuples_s = time.perf_counter() - start
+        print(f"pd.read_sql:  {len(tuples_df):>9} rows  {tuples_s:6.2f}s  {len(tuples_df) / tuples_s:>10.0f} rows/s  {_frame_mb(tuples_df):7.1f} MB")
+        del tuples_df
+        if not arrow_supported(conn):
+            print("Columnar fetch unavailable (needs python-oracledb 3.x and pyarrow)")
+            return
+        start = time.perf_counter()
+        arrow_df = read_df(sql, conn, {"n": rows}, profile="bulk")
+        arrow_s = time.perf_counter() - start
+        print(f"fetch_df_all: {len(arrow_df):>9} rows  {arrow_s:6.2f}s  {len(arrow_df) / arrow_s:>10.0f} rows/s  {_frame_mb(arrow_df):7.1f} MB")
+        print(f"Speed-up: {tuples_s / arrow_s:.1f}x")
+
+if __name__ == "__main__":
+    # python arrow_fetch.py FOISGOODS.CARR_APMT_EXCL_ADV_24_25 [rows]
+    from db_utils import close_pool
+    if len(sys.argv) < 2:
+        print("Usage: python arrow_fetch.py <schema.table> [rows]")
+        sys.exit(1)
+    try:
+        benchmark(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000)
+    finally:
+        close_pool()
@@ -1,6 +1,8 @@
 import streamlit as st
 import oracledb
 import os
+import threading
+import time
 
 # --- Oracle Instant Client Configuration ---
 INSTANT_CLIENT_PATH = r"C:\Users\Abishek\Downloads\instantclient-basic-windows.x64-23.8.0.25.04\instantclient_23_8"
@@ -14,6 +16,19 @@ DB_SID = "traffic"
 TARGET_SCHEMA = "FOISGOODS"
 DSN = f"{DB_HOST}:{DB_PORT}/{DB_SID}"
 
+# --- Connection Pool Sizing ---
+# One pool per process, shared by every Streamlit session and script.
+POOL_MIN = int(os.getenv("DB_POOL_MIN", 2))
+POOL_MAX = int(os.getenv("DB_POOL_MAX", 12))
+POOL_INCREMENT = int(os.getenv("DB_POOL_INCREMENT", 2))
+# Connections idle for longer than this (seconds) are pinged before being handed out
+POOL_PING_INTERVAL = int(os.getenv("DB_POOL_PING_INTERVAL", 60))
+# How long acquire() waits for a free connection before failing (milliseconds)
+POOL_WAIT_TIMEOUT = int(os.getenv("DB_POOL_WAIT_TIMEOUT", 30000))
+# Per-connection statement cache: bind-variable page SQL is re-executed without a parse call
+POOL_STMT_CACHE = int(os.getenv("DB_STMT_CACHE_SIZE", 50))
+APP_MODULE = "RailAnalytics"
+
 # Initialize Oracle thick mode
 try:
     if not oracledb.init_oracle_client():
@@ -22,51 +37,117 @@ except Exception as e:
     print(f"Failed to initialize Oracle Client: {str(e)}")
     if 'streamlit' in globals():
         st.error(f"""
-        ❌ Failed to initialize Oracle Client libraries. 
+        ❌ Failed to initialize Oracle Client libraries.
         Please ensure Oracle Instant Client is installed at: {INSTANT_CLIENT_PATH}
         Error: {str(e)}
         """)
 
+_pool = None
+_pool_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_acquire_stats = {
+    "acquires": 0,
+    "failures": 0,
+    "total_wait_ms": 0.0,
+    "max_wait_ms": 0.0,
+}
+
+def _init_session(connection, requested_tag):
+    """Session callback: runs once for every new session the pool creates."""
+    connection.module = APP_MODULE
+    cursor = connection.cursor()
+    cursor.execute("ALTER SESSION SET NLS_DATE_FORMAT = 'YYYY-MM-DD HH24:MI:SS'")
+    cursor.close()
+
+def _connection_error_message(error_msg):
+    if "DPY-6005" in error_msg:
+        return """
+        ❌ Failed to connect to the database.
+        Please check:
+        1. Database server is running and accessible
+        2. Network connection is stable
+        3. Credentials are correct
+        """
+    if "DPY-3010" in error_msg:
+        return """
+        ❌ Oracle Client version mismatch.
+        Please ensure you have the correct version of Oracle Instant Client installed.
+        Download from: https://www.oracle.com/database/technologies/instant-client/downloads.html
+        """
+    if "DPY-4005" in error_msg or "ORA-24459" in error_msg:
+        return f"❌ All {POOL_MAX} database connections are busy. Please try again shortly."
+    return f"❌ Database connection error: {error_msg}"
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = oracledb.create_pool(
+                    user=DB_USER,
+                    password=DB_PASSWORD,
+                    dsn=DSN,
+                    config_dir=INSTANT_CLIENT_PATH,
+                    min=POOL_MIN,
+                    max=POOL_MAX,
+                    increment=POOL_INCREMENT,
+                    ping_interval=POOL_PING_INTERVAL,
+                    getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+                    wait_timeout=POOL_WAIT_TIMEOUT,
+                    session_callback=_init_session,
+                    stmtcachesize=POOL_STMT_CACHE,
+                )
+    return _pool
+
 def get_db_connection():
-    """Create and return a database connection with proper error handling"""
+    """Acquire a pooled database connection with proper error handling.
+
+    Calling close() on the returned connection releases it back to the pool.
+    """
+    start = time.perf_counter()
     try:
-        return oracledb.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            dsn=DSN,
-            config_dir=INSTANT_CLIENT_PATH,  # Add config directory
-            thick_mode=True  # Explicitly enable thick mode
-        )
+        conn = get_pool().acquire()
     except oracledb.Error as e:
-        error_msg = str(e)
-        if "DPY-6005" in error_msg:
-            msg = """
-            ❌ Failed to connect to the database. 
-            Please check:
-            1. Database server is running and accessible
-            2. Network connection is stable
-            3. Credentials are correct
-            """
-        elif "DPY-3010" in error_msg:
-            msg = """
-            ❌ Oracle Client version mismatch. 
-            Please ensure you have the correct version of Oracle Instant Client installed.
-            Download from: https://www.oracle.com/database/technologies/instant-client/downloads.html
-            """
-        else:
-            msg = f"❌ Database connection error: {error_msg}"
-            
+        with _stats_lock:
+            _acquire_stats["failures"] += 1
+        msg = _connection_error_message(str(e))
         print(msg)
         if 'streamlit' in globals():
             st.error(msg)
         raise
+    wait_ms = (time.perf_counter() - start) * 1000
+    with _stats_lock:
+        _acquire_stats["acquires"] += 1
+        _acquire_stats["total_wait_ms"] += wait_ms
+        _acquire_stats["max_wait_ms"] = max(_acquire_stats["max_wait_ms"], wait_ms)
+    return conn
+
+def get_pool_stats():
+    """Snapshot of pool occupancy and acquire-wait timings."""
+    with _stats_lock:
+        stats = dict(_acquire_stats)
+    stats["avg_wait_ms"] = stats["total_wait_ms"] / stats["acquires"] if stats["acquires"] else 0.0
+    if _pool is not None:
+        stats["opened"] = _pool.opened
+        stats["busy"] = _pool.busy
+        stats["max"] = _pool.max
+    return stats
+
+def close_pool(force=False):
+    """Close the process-wide pool (used by CLI scripts on exit)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close(force=force)
+            _pool = None
 
 # Context manager for database connections
 class DatabaseConnection:
     def __enter__(self):
         self.conn = get_db_connection()
         return self.conn
-        
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         if hasattr(self, 'conn'):
             self.conn.close()
@@ -0,0 +1,220 @@
+import hashlib
+import io
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+# --- Disk Cache Settings ---
+# Second tier behind result_cache: page query results (aggregates, small) survive
+# restarts and redeploys. Bulk table slices are not cached here. One SQLite file
+# holds the payloads (Arrow IPC when pyarrow is installed, pickle otherwise) with a
+# SHA-256 checksum each.
+DISK_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "cache")
+DISK_CACHE_FILE = "results.sqlite"
+# Least recently used entries are deleted beyond this size
+DISK_CACHE_MAX_BYTES = int(os.getenv("DISK_CACHE_MAX_MB", 2048)) * 1024 * 1024
+
+_init_lock = threading.Lock()
+_initialised = {"path": None}
+_stats_lock = threading.Lock()
+_stats = {"reads": 0, "hits": 0, "writes": 0, "corrupt": 0, "evictions": 0}
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+def _path():
+    return os.path.join(DISK_CACHE_DIR, DISK_CACHE_FILE)
+
+def _connect():
+    """Short-lived connection per operation; WAL lets sessions read while one writes."""
+    with _init_lock:
+        if _initialised["path"] != _path():
+            os.makedirs(DISK_CACHE_DIR, exist_ok=True)
+            db = sqlite3.connect(_path(), timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    payload BLOB NOT NULL,
+                    format TEXT NOT NULL,
+                    checksum TEXT NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    suffixes TEXT NOT NULL,
+                    expires_at REAL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS idx_entries_used ON entries(last_used)")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS invalidations (
+                    suffix TEXT PRIMARY KEY,
+                    invalidated_at REAL NOT NULL
+                )
+            """)
+            db.commit()
+            db.close()
+            _initialised["path"] = _path()
+    return sqlite3.connect(_path(), timeout=30)
+
+# ------------------- Serialisation -------------------
+
+def _dumps(df):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL), "pickle"
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue(), "arrow"
+
+def _loads(payload, fmt):
+    if fmt == "arrow":
+        import pyarrow as pa
+        return pa.ipc.open_stream(payload).read_all().to_pandas()
+    return pickle.loads(payload)
+
+def _checksum(payload):
+    return hashlib.sha256(payload).hexdigest()
+
+# ------------------- Public API -------------------
+
+def get(key):
+    """(DataFrame, suffixes, expires_at) from disk, or None. Corrupt entries are dropped."""
+    _count("reads")
+    db = _connect()
+    try:
+        row = db.execute(
+            "SELECT payload, format, checksum, suffixes, expires_at FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        payload, fmt, checksum, suffixes, expires_at = row
+        if expires_at is not None and time.time() >= expires_at:
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            db.commit()
+            return None
+        try:
+            if _checksum(payload) != checksum:
+                raise ValueError("checksum mismatch")
+            df = _loads(payload, fmt)
+        except Exception:
+            _count("corrupt")
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            db.commit()
+            return None
+        db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        db.commit()
+        _count("hits")
+        return df, suffixes.strip(",").split(","), expires_at
+    finally:
+        db.close()
+
+def put(key, df, suffixes, ttl=None):
+    """Write one result; ttl None means it never expires (closed fiscal years)."""
+    payload, fmt = _dumps(df)
+    if len(payload) > DISK_CACHE_MAX_BYTES:
+        return
+    expires_at = time.time() + ttl if ttl is not None else None
+    db = _connect()
+    try:
+        db.execute(
+            "INSERT OR REPLACE INTO entries (key, payload, format, checksum, bytes, suffixes, expires_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, payload, fmt, _checksum(payload), len(payload), "," + ",".join(suffixes) + ",", expires_at, time.time())
+        )
+        _evict(db)
+        db.commit()
+        _count("writes")
+    finally:
+        db.close()
+
+def _evict(db):
+    db.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+    total = db.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+    if total <= DISK_CACHE_MAX_BYTES:
+        return
+    for key, size in db.execute("SELECT key, bytes FROM entries ORDER BY last_used").fetchall():
+        db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        _count("evictions")
+        total -= size
+        if total <= DISK_CACHE_MAX_BYTES:
+            break
+
+def invalidate(suffixes=None):
+    """Delete entries touching any of these fiscal years (default: everything)."""
+    db = _connect()
+    try:
+        if suffixes is None:
+            deleted = db.execute("DELETE FROM entries").rowcount
+        else:
+            deleted = sum(
+                db.execute("DELETE FROM entries WHERE suffixes LIKE ?", (f"%,{suffix},%",)).rowcount
+                for suffix in suffixes
+            )
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+# Invalidation markers: when a refresh or cube rebuild runs in another process (the CLI
+# jobs), it cannot reach the server's in-memory tier. It records the fiscal years it
+# invalidated here ("*" for everything) and result_cache drops older entries on its next check.
+
+def mark_invalidated(suffixes=None):
+    """Record that results touching these fiscal years (default: all) are stale as of now."""
+    now = time.time()
+    db = _connect()
+    try:
+        db.executemany(
+            "INSERT OR REPLACE INTO invalidations (suffix, invalidated_at) VALUES (?, ?)",
+            [(suffix, now) for suffix in (["*"] if suffixes is None else suffixes)]
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def invalidations():
+    """{suffix: invalidated_at} for every marker recorded so far."""
+    db = _connect()
+    try:
+        return dict(db.execute("SELECT suffix, invalidated_at FROM invalidations").fetchall())
+    finally:
+        db.close()
+
+def warm_entries(max_bytes):
+    """Most recently used, unexpired entries up to max_bytes: [(key, df, suffixes, expires_at), ...]."""
+    db = _connect()
+    try:
+        rows = db.execute(
+            "SELECT key, bytes FROM entries WHERE expires_at IS NULL OR expires_at > ? ORDER BY last_used DESC",
+            (time.time(),)
+        ).fetchall()
+    finally:
+        db.close()
+    loaded, total = [], 0
+    for key, size in rows:
+        if total + size > max_bytes:
+            break
+        entry = get(key)
+        if entry is not None:
+            loaded.append((key,) + entry)
+            total += size
+    return loaded
+
+def stats():
+    with _stats_lock:
+        snapshot = dict(_stats)
+    if os.path.exists(_path()):
+        db = _connect()
+        try:
+            snapshot["entries"], snapshot["bytes"] = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entries"
+            ).fetchone()
+        finally:
+            db.close()
+    return snapshot
@@ -1,26 +1,28 @@
-import oracledb
+import os
+import threading
+import time
 import pandas as pd
 import streamlit as st
 from datetime import datetime
 import re
-from io import BytesIO
 import plotly.express as px
-
-# --- Oracle Instant Client Configuration ---
-INSTANT_CLIENT_PATH = r"C:\Users\Craig Michael Dsouza\Downloads\instantclient-basic-windows.x64-23.8.0.25.04\instantclient_23_8"
-
-# --- Database Connection Parameters ---
-DB_USER = "intern"
-DB_PASSWORD = "inT##2025"
-DB_HOST = "10.3.9.4"
-DB_PORT = 1523
-DB_SID = "traffic"
+from db_utils import DatabaseConnection, TARGET_SCHEMA
+import fy_registry
+import arrow_fetch
+import schema_catalog
+import frame_compact
+import streaming_export
+import jobs
+import sql_templates
+from sql_templates import Binds
 
 # --- Constants ---
-TARGET_SCHEMA = "FOISGOODS"
 DATE_COLUMN = "YYMM"
 ZONE_COLUMN = "ZONE_FRM"
-DSN = f"{DB_HOST}:{DB_PORT}/{DB_SID}"
+
+# Rows/s and RSS growth of the Oracle load behind each cached selection, keyed like
+# load_data's cache (see load_key); cache hits show the stats of the load they reuse
+LOAD_STATS = {}
 
 # Financial year months (April to March)
 FINANCIAL_MONTHS = [
@@ -28,130 +30,244 @@ FINANCIAL_MONTHS = [
     "October", "November", "December", "January", "February", "March"
 ]
 
-# Map financial years to table suffixes (e.g., 2024-2025 -> 24_25)
-FINANCIAL_YEARS = {
-    "2024-2025": "24_25",
-    "2023-2024": "23_24",
-    "2022-2023": "22_23",
-    "2021-2022": "21_22",
-    "2020-2021": "20_21",
-    "2019-2020": "19_20",
-    "2018-2019": "18_19",
-    "2017-2018": "17_18"
-}
-
-@st.cache_resource
-def init_oracle_client():
-    try:
-        oracledb.init_oracle_client(lib_dir=INSTANT_CLIENT_PATH)
-        return True
-    except oracledb.Error as e:
-        st.error(f"Oracle Client Error: {e}")
-        return False
+def get_financial_years():
+    """Map financial years to table suffixes (e.g., 2024-2025 -> 24_25), newest first."""
+    return {
+        f"{fy['start_year']}-{fy['start_year'] + 1}": fy["suffix"]
+        for fy in fy_registry.fiscal_years()
+    }
 
 def get_table_name(financial_year):
     """Get table name based on financial year selection."""
-    if financial_year in FINANCIAL_YEARS:
-        return f"CARR_APMT_EXCL_ADV_{FINANCIAL_YEARS[financial_year]}"
+    financial_years = get_financial_years()
+    if financial_year in financial_years:
+        return f"CARR_APMT_EXCL_ADV_{financial_years[financial_year]}"
     return None
 
-@st.cache_data(ttl=3600, show_spinner="Loading table data...")
-def load_data(table_name):
-    """Optimized data loading that fetches all rows while being memory efficient."""
+def add_financial_columns(df):
+    """Add financial_year ("2024-2025") and financial_month ("April") from YYMM, vectorized.
+
+    Rows whose YYMM is not a valid year/month are dropped.
+    """
+    if DATE_COLUMN not in df.columns:
+        return df
+    yymm = pd.to_numeric(df[DATE_COLUMN], errors="coerce")
+    year, month = yymm // 100, yymm % 100
+    valid = (year > 0) & (month >= 1) & (month <= 12)
+    if not valid.all():
+        df, year, month = df[valid], year[valid], month[valid]
+    year, month = year.astype("int64"), month.astype("int64")
+    # April-March: January-March belong to the year that started the previous April
+    fy_start = year - (month < 4)
+    labels = {y: f"{y}-{y + 1}" for y in fy_start.unique()}
+    # Categoricals: an int8 month code per row instead of a repeated month-name string
+    df = df.assign(
+        financial_year=fy_start.map(labels).astype("category"),
+        financial_month=pd.Categorical.from_codes(((month - 4) % 12).to_numpy(), FINANCIAL_MONTHS, ordered=True),
+    )
+    return df
+
+def rss_mb():
+    """Current resident memory of this process in MB, or None when it cannot be read."""
     try:
-        with oracledb.connect(user=DB_USER, password=DB_PASSWORD, dsn=DSN) as conn:
-            # First get column names
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT * FROM {TARGET_SCHEMA}.{table_name} WHERE ROWNUM = 0")
-            cols = [col[0] for col in cursor.description]
-            
-            # Use cursor to fetch data in batches
-            cursor.execute(f"SELECT * FROM {TARGET_SCHEMA}.{table_name}")
-            
-            # Initialize empty DataFrame with correct columns
-            df = pd.DataFrame(columns=cols)
-            
-            # Fetch data in chunks to be memory efficient
-            chunk_size = 10000
-            while True:
-                rows = cursor.fetchmany(chunk_size)
-                if not rows:
-                    break
-                temp_df = pd.DataFrame(rows, columns=cols)
-                df = pd.concat([df, temp_df], ignore_index=True)
-            
-            # Convert date column if present
-            if DATE_COLUMN in df.columns:
-                df['temp_date'] = pd.to_datetime(
-                    df[DATE_COLUMN].astype(str), 
-                    format='%Y%m', 
-                    errors='coerce'
-                )
-                df = df.dropna(subset=['temp_date'])
-                # Add financial year column (April-March)
-                df['financial_year'] = df['temp_date'].apply(
-                    lambda x: f"{x.year}-{x.year+1}" if x.month >=4 else f"{x.year-1}-{x.year}"
-                )
-                # Add financial month name
-                df['financial_month'] = df['temp_date'].dt.month.apply(
-                    lambda x: FINANCIAL_MONTHS[x-4] if x >=4 else FINANCIAL_MONTHS[x+8]
-                )
-            
-            return df
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def start_rss_sampler(interval=0.05):
+    """Sample RSS in the background; the returned stop() gives the peak growth in MB (or None).
+
+    The process-lifetime peak (ru_maxrss) says nothing about one load once an earlier
+    load has been bigger, so this measures against the RSS at the start.
+    """
+    base = rss_mb()
+    peak = {"mb": base}
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(interval):
+            peak["mb"] = max(peak["mb"], rss_mb() or 0)
+
+    if base is not None:
+        threading.Thread(target=sample, name="rss-sampler", daemon=True).start()
+
+    def stop():
+        done.set()
+        if base is None:
+            return None
+        return max(peak["mb"], rss_mb() or 0) - base
+    return stop
+
+def _format_load_stats(stats):
+    rss = f", +{stats['rss_growth_mb']:.0f} MB RSS at peak" if stats["rss_growth_mb"] is not None else ""
+    return f"{stats['rows']:,} rows in {stats['seconds']:.1f}s ({stats['rows_per_sec']:,.0f} rows/s{rss})"
+
+def month_window(start_year, start_month="All", end_month="All"):
+    """YYMM ranges for a fiscal-month selection in the year starting April start_year.
+
+    A wraparound selection (e.g. February to May) gives two ranges; "All" gives none,
+    so every row of the table is kept, as the export always did.
+    """
+    def yymm(idx):
+        month = (idx + 3) % 12 + 1
+        return (start_year + (1 if month < 4 else 0)) * 100 + month
+
+    if not start_month or not end_month or start_month == "All" or end_month == "All":
+        return []
+    start_idx = FINANCIAL_MONTHS.index(start_month)
+    end_idx = FINANCIAL_MONTHS.index(end_month)
+    if start_idx <= end_idx:
+        # Normal range (e.g., April-September)
+        return [(yymm(start_idx), yymm(end_idx))]
+    # Wraparound range (e.g., February-May): end of the year plus its start
+    return [(yymm(start_idx), yymm(11)), (yymm(0), yymm(end_idx))]
+
+def build_export_query(table_name, start_month="All", end_month="All", zone="All", columns=None):
+    """SELECT for the sidebar selections: month window and zone as WHERE, columns as projection."""
+    fy = fy_registry.get(table_name[len(fy_registry.TABLE_PREFIX):])
+    known = schema_catalog.columns(table_name)
+    columns = [c for c in (columns or []) if c in known]
+    # Bind YYMM as the column's own type so the predicate compares it directly
+    # (no implicit TO_NUMBER on every row of a text column)
+    text = schema_catalog.data_type(table_name, DATE_COLUMN) in ("VARCHAR2", "CHAR", "NVARCHAR2", "NCHAR")
+    native = str if text else int
+    b = Binds()
+    conditions = []
+    ranges = month_window(fy["start_year"], start_month, end_month)
+    if ranges:
+        conditions.append("(" + " OR ".join(
+            f"{DATE_COLUMN} BETWEEN {b(native(low))} AND {b(native(high))}" for low, high in ranges
+        ) + ")")
+    if zone and zone != "All":
+        conditions.append(f"{ZONE_COLUMN} = {b(zone)}")
+    sql = f"""
+        SELECT {", ".join(columns) if columns else "*"}
+        FROM {TARGET_SCHEMA}.{table_name}
+        {"WHERE " + " AND ".join(conditions) if conditions else ""}
+    """
+    return sql, b.values
+
+@st.cache_data(ttl=3600, show_spinner="Loading table summary...")
+def load_summary(table_name):
+    """Row counts per month and zone: feeds the zone list and charts without a full load."""
+    try:
+        with DatabaseConnection() as conn:
+            df = sql_templates.read_sql(f"""
+                SELECT {DATE_COLUMN}, {ZONE_COLUMN}, COUNT(*) AS ROW_COUNT
+                FROM {TARGET_SCHEMA}.{table_name}
+                GROUP BY {DATE_COLUMN}, {ZONE_COLUMN}
+            """, conn, profile="preview")
+        return add_financial_columns(df)
     except Exception as e:
         st.error(f"Data load failed: {e}")
         return pd.DataFrame()
 
-def filter_data(df, start_month=None, end_month=None, zone=None):
-    """Filter data by month range (April-March cycle) and zone."""
-    if df.empty:
-        return df
+def export_batches(table_name, start_month="All", end_month="All", zone="All", columns=(), fmt="csv"):
+    """The selected slice streamed from Oracle, batched for fmt's writer (see streaming_export)."""
+    sql, params = build_export_query(table_name, start_month, end_month, zone, list(columns))
+    with DatabaseConnection() as conn:
+        yield from streaming_export.fetch_batches(fmt, sql, conn, params)
 
-    filtered_df = df.copy()
-    
-    if start_month and end_month and start_month != "All" and end_month != "All":
-        start_idx = FINANCIAL_MONTHS.index(start_month)
-        end_idx = FINANCIAL_MONTHS.index(end_month)
-        
-        if start_idx <= end_idx:
-            # Normal range (e.g., April-September)
-            valid_months = FINANCIAL_MONTHS[start_idx:end_idx+1]
-        else:
-            # Wraparound range (e.g., November-February)
-            valid_months = FINANCIAL_MONTHS[start_idx:] + FINANCIAL_MONTHS[:end_idx+1]
-        
-        filtered_df = filtered_df[filtered_df['financial_month'].isin(valid_months)]
-    
-    if zone and zone != "All" and ZONE_COLUMN in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df[ZONE_COLUMN] == zone]
+def expected_rows(summary, table_name, start_month="All", end_month="All", zone="All"):
+    """Rows an export of this selection will write, from the month/zone summary."""
+    fy = fy_registry.get(table_name[len(fy_registry.TABLE_PREFIX):])
+    yymm = pd.to_numeric(summary[DATE_COLUMN], errors="coerce")
+    ranges = month_window(fy["start_year"], start_month, end_month)
+    mask = pd.Series(not ranges, index=summary.index)
+    for low, high in ranges:
+        mask |= yymm.between(low, high)
+    if zone and zone != "All":
+        mask &= summary[ZONE_COLUMN] == zone
+    return int(summary.loc[mask, "ROW_COUNT"].sum())
+
+def run_export_job(params, job):
+    """Background export (see jobs): stream the selected slice into the job's result file."""
+    fmt = streaming_export.EXPORT_FORMATS[params["format"]]
+    path = job.result_path(fmt["suffix"])
+    expected = params.get("expected_rows") or 0
+
+    def progress(rows):
+        job.progress(min(rows / expected, 0.99) if expected else None, f"{rows:,} rows written")
 
-    return filtered_df.drop(['temp_date', 'financial_year', 'financial_month'], axis=1, errors='ignore')
+    stats = streaming_export.write(
+        params["format"],
+        export_batches(params["table_name"], params["start_month"], params["end_month"], params["zone"], tuple(params["columns"]), params["format"]),
+        path,
+        progress=progress,
+    )
+    if stats["rows"] == 0:
+        if os.path.exists(path):
+            os.remove(path)
+        return {"message": "No data to export."}
+    message = streaming_export.format_stats(stats)
+    if params["format"] == "xlsx" and stats["parts"] > 1:
+        message += f"; split across {stats['parts']} sheets (Excel allows {streaming_export.EXCEL_MAX_ROWS:,} rows per sheet)"
+    return {"path": path, "name": params["file_name"], "mime": fmt["mime"], "message": message}
+
+def load_key(table_name, start_month="All", end_month="All", zone="All", columns=()):
+    return (table_name, start_month, end_month, zone, tuple(columns))
+
+@st.cache_data(ttl=3600, show_spinner="Loading table data...")
+def load_data(table_name, start_month="All", end_month="All", zone="All", columns=()):
+    """Fetch only the selected slice of the table, streamed in columnar batches."""
+    stop_sampler = start_rss_sampler()
+    try:
+        sql, params = build_export_query(table_name, start_month, end_month, zone, list(columns))
+        start = time.perf_counter()
+        before_bytes, before_dtypes, batches, categorical = {}, {}, [], None
+        with DatabaseConnection() as conn:
+            # Columnar batches (see arrow_fetch), each compacted as it arrives (see
+            # frame_compact) and concatenated once at the end
+            for batch in arrow_fetch.iter_batches(sql, conn, params, profile="bulk"):
+                for col, size in frame_compact.column_bytes(batch).items():
+                    before_bytes[col] = before_bytes.get(col, 0) + size
+                before_dtypes = before_dtypes or batch.dtypes.astype(str).to_dict()
+                if categorical is None:
+                    categorical = frame_compact.categorical_columns(batch)
+                batches.append(frame_compact.compact(batch, categorical))
+        df = frame_compact.concat(batches)
+        del batches
+        elapsed = time.perf_counter() - start
+        stats = LOAD_STATS[load_key(table_name, start_month, end_month, zone, columns)] = {
+            "rows": len(df),
+            "seconds": elapsed,
+            "rows_per_sec": len(df) / elapsed if elapsed else 0.0,
+            "rss_growth_mb": stop_sampler(),
+            "memory": frame_compact.memory_report(before_bytes, before_dtypes, df),
+        }
+        print(f"Loaded {table_name}: {_format_load_stats(stats)}")
+        return df
+    except Exception as e:
+        stop_sampler()
+        st.error(f"Data load failed: {e}")
+        return pd.DataFrame()
 
 def main():
     st.set_page_config("Oracle Excel Exporter", layout="wide")
     st.title("📦 Railway Analytics Data Exporter (Financial Year)")
 
-    # Oracle Init
-    if not init_oracle_client():
-        st.stop()
-
     # Sidebar - Financial Year Selection
     with st.sidebar:
         st.header("1. Select Financial Year")
         selected_fy = st.selectbox(
             "Financial Year",
-            options=list(FINANCIAL_YEARS.keys()),
+            options=list(get_financial_years().keys()),
             index=0
         )
         
         # Automatically determine table name
         table_name = get_table_name(selected_fy)
         
-        # Load data with progress indication
-        with st.spinner(f"Loading {table_name} (this may take a while for large tables)..."):
-            df = load_data(table_name)
+        # Month/zone counts only; the rows themselves are fetched for the final selection
+        summary = load_summary(table_name)
             
-        if df.empty:
+        if summary.empty:
             st.error("No data found for selected financial year.")
             st.stop()
             
@@ -174,18 +290,31 @@ def main():
             )
         
         # Zone selection
-        zone_options = ["All"]
-        if ZONE_COLUMN in df.columns:
-            zone_options.extend(sorted(df[ZONE_COLUMN].dropna().unique()))
-        
+        zone_options = ["All"] + sorted(summary[ZONE_COLUMN].dropna().unique())
         selected_zone = st.selectbox("Zone", zone_options)
+
+        # Column selection (none selected = all columns)
+        selected_columns = st.multiselect("Columns (leave empty for all)", schema_catalog.columns(table_name))
         
         st.markdown("### Actions")
+        export_format = st.selectbox(
+            "Export format",
+            options=list(streaming_export.EXPORT_FORMATS),
+            format_func=lambda key: streaming_export.EXPORT_FORMATS[key]["label"]
+        )
         preview = st.button("🔍 Preview")
-        download = st.button("📥 Export to Excel")
+        download = st.button("📥 Export")
 
-    # Filter data
-    filtered_df = filter_data(df, start_month, end_month, selected_zone)
+    # Fetch only the selected months, zone and columns
+    filtered_df = pd.DataFrame()
+    if preview:
+        with st.spinner(f"Loading {table_name} (this may take a while for large selections)..."):
+            filtered_df = load_data(table_name, start_month, end_month, selected_zone, tuple(selected_columns))
+        stats = LOAD_STATS.get(load_key(table_name, start_month, end_month, selected_zone, selected_columns))
+        if stats is not None:
+            st.caption(f"Loaded {_format_load_stats(stats)}")
+            with st.expander("Memory per column (as fetched vs compacted)"):
+                st.dataframe(stats["memory"])
 
     # Tabs
     tab1, tab2 = st.tabs(["📊 Data Preview", "📈 Charts"])
@@ -200,46 +329,49 @@ def main():
                 st.dataframe(filtered_df.head(1000))
 
     with tab2:
-        if 'financial_month' in df.columns:
-            st.subheader("📅 Monthly Distribution")
-            month_count = df['financial_month'].value_counts()
-            month_count = month_count.reindex(FINANCIAL_MONTHS)  # Ensure correct order
-            st.bar_chart(month_count)
-
-        if ZONE_COLUMN in df.columns:
-            st.subheader("🗺️ Records by Zone")
-            zone_count = df[ZONE_COLUMN].value_counts()
-            st.bar_chart(zone_count)
-
-    # Excel Export
+        st.subheader("📅 Monthly Distribution")
+        month_count = summary.groupby('financial_month', observed=False)['ROW_COUNT'].sum()
+        month_count = month_count.reindex(FINANCIAL_MONTHS)  # Ensure correct order
+        st.bar_chart(month_count)
+
+        st.subheader("🗺️ Records by Zone")
+        zone_count = summary.groupby(ZONE_COLUMN, observed=True)['ROW_COUNT'].sum().sort_values(ascending=False)
+        st.bar_chart(zone_count)
+
+    # Export: a background job (see jobs) streams the slice into a result file, so a
+    # large export neither blocks this page nor dies with the browser tab
+    owner = st.session_state.get("username", "system")
     if download:
-        if filtered_df.empty:
-            st.warning("No data to export.")
-        else:
-            output = BytesIO()
-            with st.spinner("Preparing Excel file..."):
-                with pd.ExcelWriter(output, engine="openpyxl") as writer:
-                    filtered_df.to_excel(writer, index=False)
-
-            # Create filename
-            parts = [table_name]
-            
-            if start_month != "All" and end_month != "All":
-                month_part = f"{start_month[:3]}-{end_month[:3]}"
-                parts.append(month_part)
-            
-            if selected_zone != "All":
-                parts.append(selected_zone.replace(" ", "_"))
-            
-            filename = "_".join(parts) + ".xlsx"
+        fmt = streaming_export.EXPORT_FORMATS[export_format]
 
-            st.download_button(
-                "📥 Download Excel File",
-                data=output.getvalue(),
-                file_name=filename,
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-            st.success(f"File ready: {filename}")
+        # Create filename
+        parts = [table_name]
+        
+        if start_month != "All" and end_month != "All":
+            month_part = f"{start_month[:3]}-{end_month[:3]}"
+            parts.append(month_part)
+        
+        if selected_zone != "All":
+            parts.append(selected_zone.replace(" ", "_"))
+        
+        filename = "_".join(parts) + fmt["suffix"]
+
+        try:
+            jobs.submit("export", {
+                "table_name": table_name,
+                "start_month": start_month,
+                "end_month": end_month,
+                "zone": selected_zone,
+                "columns": list(selected_columns),
+                "format": export_format,
+                "file_name": filename,
+                "expected_rows": expected_rows(summary, table_name, start_month, end_month, selected_zone),
+            }, owner=owner, label=filename)
+            st.success(f"Export queued: {filename}. It keeps running if you leave this page.")
+        except Exception as e:
+            st.error(f"Export failed: {e}")
+
+    jobs.render_jobs(owner, "export", title="📥 Exports")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
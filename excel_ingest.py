@@ -0,0 +1,137 @@
+import pandas as pd
+from db_utils import DatabaseConnection
+
+# --- Excel to Oracle Ingestion ---
+# Create-table-and-upload for Document.py's Excel section. Runs as a background job
+# (see jobs), so nothing here touches Streamlit: failures raise, notes are returned.
+INSERT_BATCH_ROWS = 5000
+
+def read_upload(path):
+    """DataFrame from a saved .xlsx or .csv upload, without all-empty columns."""
+    if path.lower().endswith(".xlsx"):
+        df = pd.read_excel(path, engine="openpyxl")
+    elif path.lower().endswith(".csv"):
+        df = pd.read_csv(path)
+    else:
+        raise ValueError("Unsupported file format. Please upload .xls, .xlsx, or .csv")
+    df.dropna(axis=1, how='all', inplace=True)
+    return df
+
+def infer_sql_types(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "DATE"
+    try:
+        pd.to_numeric(series.dropna(), errors="raise")
+        return "NUMBER"
+    except:
+        pass
+    return "VARCHAR2(255)"
+
+def clean_columns(df):
+    """Oracle-safe upper-case column names, truncated to 30 characters."""
+    df.columns = [
+        (str(col).strip()
+        .replace(" ", "_").replace("-", "_").replace("#", "").replace("@", "")
+        .replace("(", "").replace(")", "").upper()[:30]  # truncate to 30 chars
+        if isinstance(col, str) and col.strip() else f"COLUMN_{i+1}")
+        for i, col in enumerate(df.columns)
+    ]
+    return df
+
+def create_table_from_excel(conn, df, table_name):
+    """(Re)create table_name with a column per DataFrame column; raises on failure."""
+    cursor = conn.cursor()
+    clean_columns(df)
+    columns_with_types = ", ".join([f'"{col}" {infer_sql_types(df[col])}' for col in df.columns])
+    try:
+        cursor.execute(f'DROP TABLE "{table_name}"')
+    except:
+        pass
+    cursor.execute(f'CREATE TABLE "{table_name}" ({columns_with_types})')
+    conn.commit()
+
+def _convert_columns(df):
+    notes = []
+    for col in df.columns:
+        inferred_type = infer_sql_types(df[col])
+        if inferred_type in ["NUMBER", "FLOAT"]:
+            df[col] = df[col].astype(str).str.replace(",", "", regex=False).str.replace("₹", "", regex=False)
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+        elif inferred_type == "DATE":
+            try:
+                if pd.api.types.is_numeric_dtype(df[col]):
+                    df[col] = pd.to_datetime("1899-12-30") + pd.to_timedelta(df[col], unit="D")
+                else:
+                    df[col] = pd.to_datetime(df[col], errors="coerce")
+                df[col] = df[col].dt.date
+            except Exception as e:
+                notes.append(f"Failed to convert {col} to date: {e}")
+        elif inferred_type == "VARCHAR2(255)":
+            df[col] = df[col].astype(str).str.strip()
+    df = df.replace(r'^\s*$', None, regex=True)
+    return df.astype(object).where(pd.notnull(df), None), notes
+
+def insert_data_to_table(conn, df, table_name, progress=None):
+    """Insert every row in committed batches; returns (rows inserted, conversion notes).
+
+    progress(rows_done, total_rows) is called after each batch and may raise to stop
+    (rows committed so far stay). The batch in flight is rolled back on failure.
+    """
+    cursor = conn.cursor()
+    columns = ", ".join([f'"{col}"' for col in df.columns])
+    placeholders = ", ".join([f":{i+1}" for i in range(len(df.columns))])
+    insert_sql = f"INSERT INTO \"{table_name}\" ({columns}) VALUES ({placeholders})"
+    df, notes = _convert_columns(df)
+    total_rows = len(df)
+    try:
+        for start in range(0, total_rows, INSERT_BATCH_ROWS):
+            batch = df.iloc[start:start + INSERT_BATCH_ROWS].values.tolist()
+            cursor.executemany(insert_sql, batch)
+            conn.commit()
+            if progress is not None:
+                progress(min(start + INSERT_BATCH_ROWS, total_rows), total_rows)
+    except BaseException:
+        conn.rollback()
+        raise
+    return total_rows, notes
+
+def log_uploaded_table(conn, table_name, username):
+    """Record the upload (or modification) of table_name in the EXCEL log table."""
+    cursor = conn.cursor()
+
+    # Check if table already exists in log
+    cursor.execute("SELECT COUNT(*) FROM EXCEL WHERE table_name = :1", [table_name])
+    exists = cursor.fetchone()[0]
+
+    if exists:
+        # Table already logged — update modified info
+        cursor.execute("""
+            UPDATE EXCEL
+            SET modified_by = :1,
+                modified_on = SYSTIMESTAMP
+            WHERE table_name = :2
+        """, [username, table_name])
+    else:
+        # New table log — set created_by and modified_by initially
+        cursor.execute("""
+            INSERT INTO EXCEL (table_name, created_by, created_on, modified_by, modified_on)
+            VALUES (:1, :2, SYSTIMESTAMP, :3, SYSTIMESTAMP)
+        """, [table_name, username, username])
+
+    conn.commit()
+
+def run_upload_job(params, job):
+    """Background job (see jobs): create params["table_name"] from the saved file and load it."""
+    job.progress(0.0, "Reading file")
+    df = read_upload(params["path"])
+    table_name = params["table_name"]
+    with DatabaseConnection() as conn:
+        job.progress(0.05, "Creating table")
+        create_table_from_excel(conn, df, table_name)
+        log_uploaded_table(conn, table_name, params.get("username", "system"))
+        rows, notes = insert_data_to_table(
+            conn, df, table_name,
+            progress=lambda done, total: job.progress(0.05 + 0.95 * done / total, f"{done:,} of {total:,} rows inserted")
+        )
+    message = f"Table created in Oracle; inserted {rows} rows into '{table_name}'"
+    return {"message": "; ".join([message] + notes)}
@@ -0,0 +1,65 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+import pandas as pd
+from db_utils import DatabaseConnection, POOL_MAX
+import query_cancel
+
+# --- Fan-out Settings ---
+# Independent per-fiscal-year queries run concurrently, each on its own pooled
+# connection; keep the cap below the pool size so pages are not starved.
+FANOUT_WORKERS = min(int(os.getenv("FANOUT_WORKERS", 4)), POOL_MAX)
+# Per-query limit (seconds), enforced by the driver through connection.call_timeout
+FANOUT_TIMEOUT = float(os.getenv("FANOUT_TIMEOUT", 300))
+
+def _run_one(func, item, timeout, run):
+    # Worker threads join the caller's cancellable run (see query_cancel)
+    with query_cancel.activate(run), DatabaseConnection() as conn, query_cancel.track(conn):
+        conn.call_timeout = int(timeout * 1000)
+        try:
+            return func(conn, item)
+        finally:
+            conn.call_timeout = 0
+
+def fan_out(func, items, workers=None, timeout=None):
+    """Run func(conn, item) for every item concurrently; results come back in items order.
+
+    The first failure (including a call timeout, DPY-4024) cancels the queries that
+    have not started yet and is re-raised.
+    """
+    items = list(items)
+    workers = max(1, min(workers or FANOUT_WORKERS, len(items) or 1))
+    timeout = timeout or FANOUT_TIMEOUT
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fanout") as pool:
+        run = query_cancel.current()
+        futures = [pool.submit(_run_one, func, item, timeout, run) for item in items]
+        done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in pending:
+            future.cancel()
+        for future in futures:
+            if future in done and future.exception() is not None:
+                raise future.exception()
+        return [future.result() for future in futures]
+
+def merge(frames, suffixes=None):
+    """Per-year frames as one DataFrame, in the order given (fan_out keeps items order).
+
+    With suffixes (one per frame), rows of a frame without an FY_SUFFIX column get one.
+    """
+    frames = list(frames)
+    if suffixes is not None:
+        frames = [
+            df if any(str(c).upper() == "FY_SUFFIX" for c in df.columns) else df.assign(FY_SUFFIX=suffix)
+            for df, suffix in zip(frames, suffixes)
+        ]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def read_per_year(build_sql, fiscal_years, params=None, workers=None, timeout=None):
+    """One DataFrame from build_sql(fy) run against every fiscal year, in fiscal-year order.
+
+    fiscal_years are fy_registry entries; each year's rows get an FY_SUFFIX column.
+    Entry point for multi-year reads outside the page engines (e.g. exports).
+    """
+    import sql_templates
+    years = sorted(fiscal_years, key=lambda fy: fy["start_year"])
+    frames = fan_out(lambda conn, fy: sql_templates.read_sql(build_sql(fy), conn, params, profile="bulk"), years, workers, timeout)
+    return merge(frames, [fy["suffix"] for fy in years])
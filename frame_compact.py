@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+# --- Compact Frames ---
+# Fiscal-year tables arrive with 64-bit numbers and one Python string object per cell.
+# Compacting keeps the values and shrinks the storage:
+#   - low-cardinality text (zones, commodity groups, ...) becomes categorical: one small
+#     integer code per row plus a single copy of each distinct string
+#   - integers, and floats that hold only whole numbers, are downcast to the smallest
+#     integer type that fits; fractional floats (freight, GST) stay float64
+# Batches are compacted as they stream in; concat() then merges their categories.
+
+# Always categorical when present, whatever the first batch looks like
+CATEGORICAL_COLUMNS = {"ZONE_FRM", "ZONE_TO", "GRP", "FY_SUFFIX", "financial_year", "financial_month"}
+# Other text columns become categorical when distinct values are at most this share of rows
+CATEGORY_RATIO = 0.5
+
+def categorical_columns(df):
+    """Columns of df worth storing as categoricals (decided once, from the first batch)."""
+    chosen = []
+    for col in df.columns:
+        if not (df[col].dtype == object or isinstance(df[col].dtype, pd.CategoricalDtype)):
+            continue
+        if col in CATEGORICAL_COLUMNS or (len(df) and df[col].nunique() <= CATEGORY_RATIO * len(df)):
+            chosen.append(col)
+    return chosen
+
+def _downcast(series):
+    if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+        return series
+    if pd.api.types.is_float_dtype(series):
+        values = series.to_numpy()
+        if series.isna().any() or not np.array_equal(values, np.floor(values)):
+            return series
+        series = series.astype("int64")
+    return pd.to_numeric(series, downcast="integer")
+
+def compact(df, categorical=None):
+    """Compacted copy of df; categorical defaults to categorical_columns(df)."""
+    categorical = set(categorical_columns(df) if categorical is None else categorical)
+    return pd.DataFrame({
+        col: df[col].astype("category") if col in categorical else _downcast(df[col])
+        for col in df.columns
+    }, index=df.index)
+
+def concat(frames):
+    """pd.concat for compacted batches, keeping categoricals categorical.
+
+    Batches usually see different category sets, which plain pd.concat would turn back
+    into object columns; each column is recoded to the union of categories first.
+    """
+    frames = list(frames)
+    if len(frames) == 1:
+        return frames[0]
+    first = frames[0]
+    for col in first.columns:
+        if isinstance(first[col].dtype, pd.CategoricalDtype) and not first[col].cat.ordered:
+            union = pd.api.types.union_categoricals([f[col] for f in frames], ignore_order=True)
+            dtype = pd.CategoricalDtype(union.categories)
+            frames = [f.assign(**{col: f[col].astype(dtype)}) for f in frames]
+    return pd.concat(frames, ignore_index=True)
+
+def column_bytes(df):
+    """{column: bytes} including the strings behind object columns."""
+    return df.memory_usage(deep=True, index=False).to_dict()
+
+def memory_report(before_bytes, before_dtypes, df):
+    """Bytes per column before and after compaction, largest first, with a total row."""
+    after_bytes = column_bytes(df)
+    report = pd.DataFrame({
+        "dtype_before": pd.Series(before_dtypes),
+        "bytes_before": pd.Series(before_bytes),
+        "dtype_after": df.dtypes.astype(str),
+        "bytes_after": pd.Series(after_bytes),
+    }).sort_values("bytes_before", ascending=False)
+    report.loc["TOTAL"] = ["", report["bytes_before"].sum(), "", report["bytes_after"].sum()]
+    report["saved_%"] = (1 - report["bytes_after"] / report["bytes_before"].where(report["bytes_before"] > 0)) * 100
+    return report
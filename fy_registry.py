@@ -0,0 +1,92 @@
+import re
+import threading
+import time
+from db_utils import DatabaseConnection, TARGET_SCHEMA
+
+# --- Registry Settings ---
+TABLE_PREFIX = "CARR_APMT_EXCL_ADV_"
+TABLE_PATTERN = r"CARR\_APMT\_EXCL\_ADV\_%"
+SUFFIX_RE = re.compile(r"^(\d{2})_(\d{2})$")
+# Row counts / optimizer stats are refreshed from ALL_TABLES at most this often (seconds)
+REGISTRY_TTL = 900
+
+_lock = threading.Lock()
+_registry = {"years": [], "loaded_at": 0.0}
+
+def _fiscal_year(table_name, num_rows, blocks, last_analyzed):
+    """Build a registry entry for CARR_APMT_EXCL_ADV_yy_yy, or None for unrelated tables."""
+    match = SUFFIX_RE.match(table_name[len(TABLE_PREFIX):])
+    if not match:
+        return None
+    start_year = 2000 + int(match.group(1))
+    if 2000 + int(match.group(2)) != start_year + 1:
+        return None
+    suffix = match.group(0)
+    return {
+        "suffix": suffix,                                   # "24_25"
+        "table": f"{TARGET_SCHEMA}.{table_name}",
+        "start_year": start_year,                           # 2024
+        "label": f"{start_year}-{suffix[3:]}",              # "2024-25"
+        "first_yymm": start_year * 100 + 4,                 # 202404
+        "last_yymm": (start_year + 1) * 100 + 3,            # 202503
+        "num_rows": num_rows,
+        "blocks": blocks,
+        "last_analyzed": last_analyzed,
+    }
+
+def _discover():
+    with DatabaseConnection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT TABLE_NAME, NUM_ROWS, BLOCKS, LAST_ANALYZED FROM ALL_TABLES
+            WHERE OWNER = :owner AND TABLE_NAME LIKE :pattern ESCAPE '\\'
+        """, owner=TARGET_SCHEMA, pattern=TABLE_PATTERN)
+        rows = cursor.fetchall()
+        cursor.close()
+    years = [fy for fy in (_fiscal_year(*row) for row in rows) if fy]
+    return sorted(years, key=lambda fy: fy["start_year"], reverse=True)
+
+def fiscal_years():
+    """All discovered fiscal-year tables, newest first."""
+    with _lock:
+        if not _registry["years"] or time.monotonic() - _registry["loaded_at"] >= REGISTRY_TTL:
+            try:
+                _registry["years"] = _discover()
+            except Exception:
+                # DB unreachable (e.g. maintenance window): keep the last known list,
+                # or fall back to the years held in the local Parquet snapshot
+                if not _registry["years"]:
+                    import parquet_snapshot
+                    _registry["years"] = parquet_snapshot.manifest_years()
+                if not _registry["years"]:
+                    raise
+            _registry["loaded_at"] = time.monotonic()
+        return list(_registry["years"])
+
+def refresh():
+    """Drop the cached registry so the next call re-reads ALL_TABLES."""
+    with _lock:
+        _registry["years"] = []
+
+def suffixes():
+    """['25_26', '24_25', ...] newest first."""
+    return [fy["suffix"] for fy in fiscal_years()]
+
+def year_labels():
+    """{'25_26': '2025-26', ...}"""
+    return {fy["suffix"]: fy["label"] for fy in fiscal_years()}
+
+def get(suffix):
+    for fy in fiscal_years():
+        if fy["suffix"] == suffix:
+            return fy
+    return None
+
+def tables_for_range(start_yymm, end_yymm):
+    """Fiscal-year entries whose April..March span overlaps YYYYMM range start..end (oldest first)."""
+    start_yymm, end_yymm = int(start_yymm), int(end_yymm)
+    covering = [
+        fy for fy in fiscal_years()
+        if fy["first_yymm"] <= end_yymm and fy["last_yymm"] >= start_yymm
+    ]
+    return sorted(covering, key=lambda fy: fy["start_year"])
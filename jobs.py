@@ -0,0 +1,427 @@
+import functools
+import importlib
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# --- Job Settings ---
+# Long operations (large exports, Excel-to-Oracle uploads) run in a pool of worker
+# processes instead of the Streamlit script thread: pages enqueue a job and poll it.
+# Jobs live in a SQLite table next to their result files, so they survive closed tabs
+# and server restarts, and results can be downloaded later. Input files (uploads) are
+# copied to JOBS_DIR/uploads/<job id> at submit time and deleted when the job ends.
+JOBS_DIR = os.getenv("JOBS_DIR", "jobs")
+JOBS_FILE = "jobs.sqlite"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+# Finished jobs and their result files are deleted after this many days
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", 7))
+# st.download_button holds the whole file in server memory while it is offered, so
+# results are only loaded when the user asks, and larger files are not offered at all
+JOB_DOWNLOAD_MAX_MB = int(os.getenv("JOB_DOWNLOAD_MAX_MB", 512))
+
+# kind -> "module:function"; handler(params, job) returns {"path", "name", "mime", "message"}
+HANDLERS = {
+    "export": "download_data:run_export_job",
+    "excel_upload": "excel_ingest:run_upload_job",
+}
+ACTIVE = ("queued", "running")
+
+class JobCancelled(Exception):
+    """Raised inside a handler (by JobContext.progress) once cancellation is requested."""
+
+_init_lock = threading.Lock()
+_initialised = {"path": None}
+_executor = {"pool": None, "recovered": False}
+_requeued = set()    # jobs already moved once to a fresh pool after a worker crash
+
+def _path():
+    return os.path.join(JOBS_DIR, JOBS_FILE)
+
+def _connect():
+    with _init_lock:
+        if _initialised["path"] != _path():
+            os.makedirs(os.path.join(JOBS_DIR, "results"), exist_ok=True)
+            os.makedirs(os.path.join(JOBS_DIR, "uploads"), exist_ok=True)
+            db = sqlite3.connect(_path(), timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    label TEXT,
+                    owner TEXT,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    message TEXT,
+                    error TEXT,
+                    result_path TEXT,
+                    result_name TEXT,
+                    result_mime TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    pid INTEGER,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_owner ON jobs(owner, created_at)")
+            db.commit()
+            db.close()
+            _initialised["path"] = _path()
+    db = sqlite3.connect(_path(), timeout=30)
+    db.row_factory = sqlite3.Row
+    return db
+
+def _update(job_id, **fields):
+    db = _connect()
+    try:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        db.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+        db.commit()
+    finally:
+        db.close()
+
+# ------------------- Worker Side -------------------
+
+class JobContext:
+    """What a handler gets to report progress, check cancellation and place its result."""
+
+    def __init__(self, job_id):
+        self.id = job_id
+
+    def cancel_requested(self):
+        return bool(get(self.id)["cancel_requested"])
+
+    def progress(self, fraction=None, message=None):
+        """Record progress (fraction 0-1, None keeps the last one); raises JobCancelled if asked to stop."""
+        fields = {"message": message} if message is not None else {}
+        if fraction is not None:
+            fields["progress"] = max(0.0, min(float(fraction), 1.0))
+        if fields:
+            _update(self.id, **fields)
+        if self.cancel_requested():
+            raise JobCancelled()
+
+    def result_path(self, suffix):
+        return os.path.join(JOBS_DIR, "results", f"{self.id}{suffix}")
+
+def _remove_results(job_id, folder="results"):
+    folder = os.path.join(JOBS_DIR, folder)
+    for name in os.listdir(folder) if os.path.isdir(folder) else []:
+        if name.startswith(job_id):
+            os.remove(os.path.join(folder, name))
+
+def _run_job(job_id):
+    """Worker-process entry point: claim the job, run its handler, record the outcome."""
+    db = _connect()
+    try:
+        claimed = db.execute(
+            "UPDATE jobs SET status = 'running', started_at = ?, pid = ? WHERE id = ? AND status = 'queued' AND cancel_requested = 0",
+            (time.time(), os.getpid(), job_id)
+        ).rowcount
+        db.commit()
+    finally:
+        db.close()
+    if not claimed:
+        # Another dispatch of the same job won the claim (or it was cancelled while
+        # queued): its upload and results belong to that run, so leave them alone
+        return
+    job = get(job_id)
+    try:
+        module_name, func_name = HANDLERS[job["kind"]].split(":")
+        handler = getattr(importlib.import_module(module_name), func_name)
+        result = handler(json.loads(job["params"]), JobContext(job_id)) or {}
+        _update(job_id, status="done", progress=1.0, finished_at=time.time(),
+                message=result.get("message", "Done"), result_path=result.get("path"),
+                result_name=result.get("name"), result_mime=result.get("mime"))
+    except JobCancelled:
+        _remove_results(job_id)
+        _update(job_id, status="cancelled", finished_at=time.time(), message="Cancelled")
+    except Exception as e:
+        traceback.print_exc()
+        _remove_results(job_id)
+        _update(job_id, status="failed", finished_at=time.time(), error=f"{type(e).__name__}: {e}")
+    finally:
+        _remove_results(job_id, "uploads")
+
+# ------------------- Server Side -------------------
+
+def _pool():
+    """The process pool, started on first use (and again after a worker crash broke it)."""
+    with _init_lock:
+        pool = _executor["pool"]
+        if pool is None:
+            # spawn on every platform: forking a multi-threaded Streamlit server is unsafe
+            pool = _executor["pool"] = ProcessPoolExecutor(max_workers=JOB_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return pool
+
+def _recover_once():
+    """Recover jobs from a previous run, once per process, before this process queues its own."""
+    with _init_lock:
+        if _executor["recovered"]:
+            return
+        _executor["recovered"] = True
+    _recover()
+
+def _discard_pool(pool):
+    # A worker that dies abruptly (out of memory, killed) breaks the whole executor:
+    # every later submit raises BrokenProcessPool, so drop it and let _pool() start anew
+    with _init_lock:
+        if _executor["pool"] is pool:
+            _executor["pool"] = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _dispatch(job_id):
+    """Hand a queued job to the pool, replacing the pool if it is broken."""
+    pool = _pool()
+    try:
+        future = pool.submit(_run_job, job_id)
+    except (BrokenProcessPool, RuntimeError):    # RuntimeError: pool already shut down
+        _discard_pool(pool)
+        pool = _pool()
+        future = pool.submit(_run_job, job_id)
+    future.add_done_callback(functools.partial(_on_done, pool, job_id))
+
+def _on_done(pool, job_id, future):
+    """Settle a job whose worker died before _run_job could record the outcome."""
+    error = None if future.cancelled() else future.exception()
+    if not future.cancelled() and error is None:
+        return
+    if future.cancelled() or isinstance(error, BrokenProcessPool):
+        _discard_pool(pool)
+    job = get(job_id)
+    if job is None:
+        return
+    if job["status"] == "queued" and job_id not in _requeued:
+        # Never started: the pool broke under another job, so run it on a fresh one
+        _requeued.add(job_id)
+        _dispatch(job_id)
+    elif job["status"] in ACTIVE:
+        reason = "Worker process died (out of memory or killed)" if future.cancelled() or isinstance(error, BrokenProcessPool) else f"{type(error).__name__}: {error}"
+        _fail_orphan(job_id, reason)
+
+def _fail_orphan(job_id, reason):
+    _remove_results(job_id)
+    _remove_results(job_id, "uploads")
+    db = _connect()
+    try:
+        db.execute(
+            "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ? AND status IN ('queued', 'running')",
+            (time.time(), reason, job_id)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def _pid_alive(pid):
+    """True/False when the process can be checked, None when it cannot."""
+    try:
+        import psutil
+        return psutil.pid_exists(pid)
+    except ImportError:
+        pass
+    if os.name == "nt":
+        return None    # os.kill on Windows terminates the process instead of probing it
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def reap():
+    """Fail running jobs whose worker process is gone (e.g. killed by another server's restart)."""
+    db = _connect()
+    try:
+        running = db.execute("SELECT id, pid FROM jobs WHERE status = 'running' AND pid IS NOT NULL").fetchall()
+    finally:
+        db.close()
+    dead = [row["id"] for row in running if _pid_alive(row["pid"]) is False]
+    for job_id in dead:
+        _fail_orphan(job_id, "Worker process died (out of memory or killed)")
+    return len(dead)
+
+def _recover():
+    """Fail jobs whose worker is gone, requeue ones never started, drop expired ones.
+
+    Running jobs are checked by pid (see reap) rather than failed wholesale: another
+    app process sharing JOBS_DIR may still be running them.
+    """
+    reap()
+    db = _connect()
+    try:
+        cutoff = time.time() - JOB_RETENTION_DAYS * 86400
+        expired = [row["id"] for row in db.execute("SELECT id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,))]
+        db.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in expired])
+        queued = [row["id"] for row in db.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at")]
+        db.commit()
+    finally:
+        db.close()
+    for job_id in expired:
+        _remove_results(job_id)
+        _remove_results(job_id, "uploads")
+    for job_id in queued:
+        _dispatch(job_id)
+
+def submit(kind, params, owner=None, label=None, upload=None):
+    """Queue a job; returns its id. params must be JSON-serialisable.
+
+    upload is an input file for the job: it is copied to a path owned by the job, passed
+    as params["path"] and deleted when the job ends, so a later upload of a file with
+    the same name cannot change what a queued job reads.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    # Recovery re-dispatches every queued row, so it must run before this job is inserted
+    _recover_once()
+    job_id = uuid.uuid4().hex[:12]
+    db = _connect()
+    try:
+        if upload is not None:
+            path = os.path.join(JOBS_DIR, "uploads", f"{job_id}{os.path.splitext(upload)[1]}")
+            shutil.copyfile(upload, path)
+            params = {**params, "path": path}
+        db.execute(
+            "INSERT INTO jobs (id, kind, label, owner, params, status, created_at) VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+            (job_id, kind, label or kind, owner, json.dumps(params), time.time())
+        )
+        db.commit()
+    finally:
+        db.close()
+    _dispatch(job_id)
+    return job_id
+
+def get(job_id):
+    db = _connect()
+    try:
+        row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+    finally:
+        db.close()
+
+def list_jobs(owner=None, kind=None, limit=20):
+    """Most recent jobs first, optionally for one owner and/or kind."""
+    conditions, values = [], []
+    if owner is not None:
+        conditions.append("owner = ?")
+        values.append(owner)
+    if kind is not None:
+        conditions.append("kind = ?")
+        values.append(kind)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    db = _connect()
+    try:
+        rows = db.execute(f"SELECT * FROM jobs {where} ORDER BY created_at DESC LIMIT ?", (*values, limit)).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        db.close()
+
+def cancel(job_id):
+    """Ask a job to stop: queued jobs are cancelled at once, running ones at their next progress report."""
+    db = _connect()
+    try:
+        db.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status IN ('queued', 'running')", (job_id,))
+        never_started = db.execute(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ?, message = 'Cancelled' WHERE id = ? AND status = 'queued'",
+            (time.time(), job_id)
+        ).rowcount
+        db.commit()
+    finally:
+        db.close()
+    if never_started:
+        # No worker can claim it any more (see _run_job), so its upload is not needed
+        _remove_results(job_id, "uploads")
+
+# ------------------- Streamlit Panel -------------------
+
+def _download(st, job):
+    """Download button for a finished job's result file, read only once the user asks for it."""
+    path = job["result_path"]
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    if size_mb > JOB_DOWNLOAD_MAX_MB:
+        st.caption(f"{size_mb:,.0f} MB, too large for the browser: {os.path.abspath(path)}")
+        return
+    ready = f"download_ready_{job['id']}"
+    if not st.session_state.get(ready):
+        if not st.button(f"📥 Prepare ({size_mb:,.1f} MB)", key=f"prepare_{job['id']}"):
+            return
+        st.session_state[ready] = True
+    with open(path, "rb") as f:
+        data = f.read()
+    st.download_button(
+        "📥 Download",
+        data=data,
+        file_name=job["result_name"] or os.path.basename(path),
+        mime=job["result_mime"] or "application/octet-stream",
+        key=f"download_{job['id']}",
+        # Later reruns stop holding the file once it has been downloaded
+        on_click=lambda: st.session_state.pop(ready, None),
+    )
+
+def _job_row(st, job):
+    created = time.strftime("%Y-%m-%d %H:%M", time.localtime(job["created_at"]))
+    col1, col2 = st.columns([5, 1])
+    with col1:
+        st.markdown(f"**{job['label']}** · {job['status']} · {created}")
+        if job["status"] in ACTIVE:
+            st.progress(job["progress"], text=job["message"] or "Waiting for a worker...")
+        elif job["status"] == "failed":
+            st.error(job["error"])
+        elif job["message"]:
+            st.caption(job["message"])
+    with col2:
+        if job["status"] in ACTIVE:
+            if st.button("✖ Cancel", key=f"cancel_{job['id']}"):
+                cancel(job["id"])
+                st.rerun()
+        elif job["status"] == "done" and job["result_path"] and os.path.exists(job["result_path"]):
+            _download(st, job)
+
+def render_jobs(owner=None, kind=None, title="Background jobs"):
+    """Job list with progress, cancel and download buttons; active jobs refresh themselves.
+
+    Only active jobs are polled. Finished jobs, and their download buttons, are
+    drawn with the page, so polling never touches a result file.
+    """
+    import streamlit as st
+
+    # After a restart, queued jobs resume with the first page that shows jobs
+    _recover_once()
+    reap()
+    jobs = list_jobs(owner, kind)
+    if not jobs:
+        return
+    st.subheader(title)
+    active_ids = [job["id"] for job in jobs if job["status"] in ACTIVE]
+
+    def active_panel(polling=False):
+        if polling:
+            reap()
+        active = [job for job in list_jobs(owner, kind) if job["status"] in ACTIVE]
+        if polling and [job["id"] for job in active] != active_ids:
+            # A job finished (or was added): rerun the page once to list it with the
+            # finished ones; polling stops when nothing is active any more
+            st.rerun()
+        for job in active:
+            _job_row(st, job)
+
+    fragment = getattr(st, "fragment", None)
+    if active_ids and fragment is not None:
+        # Streamlit 1.37+: only the active jobs rerun while polling, not the whole page
+        fragment(run_every=3)(active_panel)(polling=True)
+    elif active_ids:
+        active_panel()
+        st.button("🔄 Refresh jobs")
+    for job in jobs:
+        if job["status"] not in ACTIVE:
+            _job_row(st, job)
@@ -0,0 +1,40 @@
+import query_engine
+import fanout
+
+# A metric is a conditional sum over the page row source (see agg_cube.source_sql):
+#   {"name": "WR_WR", "measure": "WR", "filter": "ZONE_FRM = 'WR'"}
+# "filter" is optional; "measure" is a key of agg_cube.MEASURES.
+
+def metric_sql(metrics, source):
+    """One conditional-aggregation statement answering every metric per fiscal year."""
+    cols = []
+    for m in metrics:
+        if m.get("filter"):
+            cols.append(f"SUM(CASE WHEN {m['filter']} THEN {m['measure']} ELSE 0 END) AS {m['name']}")
+        else:
+            cols.append(f"SUM({m['measure']}) AS {m['name']}")
+    return f"""
+        SELECT FY_SUFFIX, {", ".join(cols)}
+        FROM ({source})
+        GROUP BY FY_SUFFIX
+    """
+
+def compute(metrics, suffixes, per_table=False):
+    """Tidy DataFrame (FY_SUFFIX, METRIC, VALUE) for every metric and fiscal year.
+
+    By default all years are answered by a single statement; per_table=True issues
+    one statement per fiscal year instead (still one scan per table, not per metric),
+    run concurrently against Oracle so the wait is that of the slowest year.
+    Years without rows get 0 for every metric.
+    """
+    engine = query_engine.get_engine(suffixes)
+    measures = {m["measure"]: m["measure"] for m in metrics}
+    build_query = lambda source: metric_sql(metrics, source)
+    if per_table:
+        wide = fanout.merge(engine.read_sql_per_year(build_query, measures, suffixes), suffixes)
+    else:
+        wide = engine.read_sql(build_query, measures, suffixes)
+    wide.columns = [c.upper() for c in wide.columns]
+    names = [m["name"].upper() for m in metrics]
+    wide = wide.set_index("FY_SUFFIX").reindex(suffixes).rename_axis("FY_SUFFIX")[names].fillna(0).astype(float)
+    return wide.reset_index().melt(id_vars="FY_SUFFIX", var_name="METRIC", value_name="VALUE")
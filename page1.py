@@ -1,58 +1,27 @@
 import streamlit as st
 st.set_page_config(layout="wide")
-import oracledb
 import pandas as pd
 import plotly.express as px
-from testquery import DB_HOST, DB_SID, DB_USER, DB_PASSWORD, DB_PORT
+import fy_registry
+import page_queries
+import query_cancel
 
 
-# Dropdown for year selection
-years = [
-    "25_26", "24_25", "23_24", "22_23", "21_22", "20_21", "19_20", "18_19", "17_18"
-]
-year_labels = {
-    "25_26": "2025-26",
-    "24_25": "2024-25",
-    "23_24": "2023-24",
-    "22_23": "2022-23",
-    "21_22": "2021-22",
-    "20_21": "2020-21",
-    "19_20": "2019-20",
-    "18_19": "2018-19",
-    "17_18": "2017-18"
-}
-selected_year = st.selectbox("Select Year", [year_labels[y] for y in years[:5]])
-
-# Get the index of the selected year
-selected_idx = [year_labels[y] for y in years].index(selected_year)
-# Get the 5 years (selected and previous 4)
-table_years = years[selected_idx:selected_idx+5]
-
-# Prepare table names
-table_names = [f"carr_apmt_excl_adv_{y}" for y in table_years]
-
-# Oracle connection string
-dsn = oracledb.makedsn(DB_HOST, DB_PORT, sid=DB_SID)
-conn = oracledb.connect(user=DB_USER, password=DB_PASSWORD, dsn=dsn)
-cur = conn.cursor()
+# Dropdown for year selection (fiscal-year tables discovered from the dictionary)
+year_labels = fy_registry.year_labels()
+selected_year = st.selectbox("Select Year", [year_labels[y] for y in page_queries.page1_dropdown()])
+selected_suffix = [k for k, v in year_labels.items() if v == selected_year][0]
 
-TARGET_SCHEMA = "FOISGOODS"
+# Get the 5 years (selected and previous 4)
+table_years = page_queries.page1_years(selected_suffix)
 
-# SQL templates
-queries = [
-    "SELECT SUM(CHBL_WGHT) AS SUM_DIFF FROM {schema}.{table} WHERE ZONE_FRM = 'WR'",
-    "SELECT SUM(TOT_FRT_INCL_GST - TOT_GST) AS SUM_DIFF FROM {schema}.{table} WHERE ZONE_FRM = 'WR'",
-    "SELECT SUM(WR) AS SUM_DIFF FROM {schema}.{table} WHERE ZONE_FRM = 'WR'",
-    "SELECT SUM(WR) AS SUM_DIFF FROM {schema}.{table} WHERE ZONE_FRM != 'WR'"
-]
+PAGE1_METRICS = page_queries.PAGE1_METRICS
+metrics_df = query_cancel.streamlit_run(lambda: page_queries.page1_metrics(table_years))
+metric_values = metrics_df.pivot(index="FY_SUFFIX", columns="METRIC", values="VALUE")
 
 results = []
-for table in table_names:
-    row_vals = []
-    for q in queries:
-        cur.execute(q.format(schema=TARGET_SCHEMA, table=table))
-        val = cur.fetchone()[0] or 0
-        row_vals.append(val)
+for suffix in table_years:
+    row_vals = [metric_values.loc[suffix, m["name"]] for m in PAGE1_METRICS]
     # Derived rows
     row3, row4 = row_vals[2], row_vals[3]
     row5 = row3 + row4
@@ -67,9 +36,6 @@ for table in table_names:
     derived_percent = [round(r * 100, 2) if r is not None else None for r in [row6, row7, row8, row9]]
     results.append(row_vals_crore + derived_percent)
 
-cur.close()
-conn.close()
-
 # Define row names before creating DataFrame
 row_names = [
     "SUM(CHBL_WGHT) (WR)", "SUM(TOT_FRT_INCL_GST - TOT_GST) (WR)",
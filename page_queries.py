@@ -0,0 +1,274 @@
+import fy_registry
+import metric_engine
+import query_engine
+from sql_templates import Binds
+
+# Page query builders, free of Streamlit so the pages and the cache pre-warmer (see
+# prewarm) build byte-identical queries -- and therefore identical result_cache keys.
+
+MONTHS = {
+    "April": "04", "May": "05", "June": "06", "July": "07", "August": "08",
+    "September": "09", "October": "10", "November": "11", "December": "12",
+    "January": "01", "February": "02", "March": "03"
+}
+
+# ------------------- page1 -------------------
+
+# Rows 1-4 of the summary: one conditional-aggregation scan per year, the five years in parallel
+PAGE1_METRICS = [
+    {"name": "CHBL_WGHT_WR", "measure": "CHBL_WGHT", "filter": "ZONE_FRM = 'WR'"},
+    {"name": "FREIGHT_WR", "measure": "FREIGHT", "filter": "ZONE_FRM = 'WR'"},
+    {"name": "WR_WR", "measure": "WR", "filter": "ZONE_FRM = 'WR'"},
+    {"name": "WR_NOT_WR", "measure": "WR", "filter": "ZONE_FRM != 'WR'"},
+]
+
+def page1_dropdown():
+    """Year suffixes offered by page1, newest first."""
+    return fy_registry.suffixes()[:5]
+
+def page1_years(selected_suffix):
+    """The selected year and the previous four."""
+    years = fy_registry.suffixes()
+    selected_idx = years.index(selected_suffix)
+    return years[selected_idx:selected_idx + 5]
+
+def page1_metrics(table_years):
+    return metric_engine.compute(PAGE1_METRICS, table_years, per_table=True)
+
+# ------------------- pages4 -------------------
+
+# Every measure, with and without the ZONE_FRM = 'WR' filter, comes out of one scan of the
+# row source; Tables 1-3 (and the Table 4 ratio) are sliced from that single frame.
+FUSED_MEASURES = ["CHBL_WGHT", "FREIGHT", "WR"]
+FUSED_SCOPES = {"WR": "ZONE_FRM = 'WR'", "ALL": "1 = 1"}
+
+def pages4_dropdown():
+    """Year suffixes offered by pages4, newest first."""
+    return fy_registry.suffixes()[:4]
+
+def pages4_context(selected_year_code, selected_month):
+    """Everything pages4 derives from its two dropdowns."""
+    start_year = int(f"20{selected_year_code[:2]}")
+    end_year = int(f"20{selected_year_code[3:]}")
+    previous_years = [(start_year - i - 1, start_year - i) for i in reversed(range(5))]
+    # Only the fiscal years the page reads (5 previous years + selected year)
+    table_years = fy_registry.tables_for_range(f"{previous_years[0][0]}04", f"{end_year}03")
+    months_to_include = list(MONTHS.items())[:list(MONTHS).index(selected_month) + 1]
+    return {
+        "start_year": start_year,
+        "end_year": end_year,
+        "previous_years": previous_years,
+        "previous_year_labels": [f"{y1}-{str(y2)[-2:]}" for y1, y2 in previous_years],
+        "table_list": [fy["table"] for fy in table_years],
+        "table_suffixes": [fy["suffix"] for fy in table_years],
+        "cumulative_months_YYMM": [f"{start_year}{m_code}" for m_name, m_code in months_to_include],
+    }
+
+def fused_periods(ctx, binds):
+    """Short period key -> YYMM condition, in display order (previous years, selected month, selected year).
+
+    Every bound is a bind variable and the month list is padded to 12 slots, so the
+    statement text is the same for every year/month selection.
+    """
+    periods = {f"P{i}": f"YYMM BETWEEN {binds(f'{y1}04')} AND {binds(f'{y2}03')}" for i, (y1, y2) in enumerate(ctx["previous_years"])}
+    months = ctx["cumulative_months_YYMM"]
+    month_slots = months + months[:1] * (12 - len(months))
+    periods["SM"] = f"YYMM IN ({binds.in_list(month_slots)})"
+    start_year, end_year = ctx["start_year"], ctx["end_year"]
+    periods["SY"] = f"YYMM BETWEEN {binds(f'{start_year}04')} AND {binds(f'{end_year}03')}"
+    return periods
+
+def pages4_fused(ctx):
+    """The fused multi-measure frame behind pages4 Tables 1-4."""
+    engine = query_engine.get_engine(ctx["table_suffixes"])
+    binds = Binds()
+    periods = fused_periods(ctx, binds)
+    sums = [f"SUM(CASE WHEN ZONE_FRM = 'WR' THEN 1 ELSE 0 END) AS \"WR_ROWS\""]
+    for measure in FUSED_MEASURES:
+        for scope, scope_cond in FUSED_SCOPES.items():
+            for key, period_cond in periods.items():
+                sums.append(f"SUM(CASE WHEN {scope_cond} AND {period_cond} THEN {measure} ELSE 0 END) AS \"{measure}_{scope}_{key}\"")
+    sums_sql = ",\n                    ".join(sums)
+
+    # The row source is the local snapshot, the monthly cube or the raw UNION ALL (see query_engine)
+    def build_query(with_clause):
+        return f"""
+            WITH all_data AS (
+                {with_clause}
+            )
+            SELECT
+                GRP AS COMMODITY,
+                {sums_sql}
+            FROM all_data
+            WHERE GRP IS NOT NULL
+            GROUP BY GRP
+            ORDER BY GRP
+            """
+
+    # Both zone scopes are needed, so only the month window is pushed into the scan
+    window = {"yymm": (f"{ctx['previous_years'][0][0]}04", f"{ctx['end_year']}03")}
+    return engine.read_sql(build_query, {m: m for m in FUSED_MEASURES}, ctx["table_suffixes"], window, binds.values)
+
+# ------------------- pages3 -------------------
+
+COMMODITY_GRPS = "'01','02','03','04','05','06','07','08'"
+TABLES = ("T1", "T2", "T3")
+
+def pages3_year_options():
+    """Oldest first, e.g. "2017_18", from the fiscal-year tables present in the database."""
+    return [f"{fy['start_year']}_{fy['suffix'][3:]}" for fy in reversed(fy_registry.fiscal_years())]
+
+def pages3_dropdown():
+    return pages3_year_options()[5:]
+
+def get_ranges(start_year, selected_code):
+    apr_to_month, month_plus_to_mar = [], []
+    for i in range(6):
+        y = start_year + i
+        ny = y + 1
+        apr_to_month.append((y, f"{y}04", f"{y}{selected_code}", f"{ny}03"))
+        next_m = int(selected_code) + 1
+        sm = f"{y}{next_m:02d}" if next_m <= 12 else f"{ny}01"
+        em = f"{ny}03"
+        month_plus_to_mar.append((y, sm, em, f"{ny}03"))
+    return apr_to_month, month_plus_to_mar
+
+def pages3_context(selected_year_label, selected_month_label):
+    """Everything pages3 derives from its two dropdowns."""
+    year_options = pages3_year_options()
+    # Calculate display years for 5 years up to selected year
+    end_index = year_options.index(selected_year_label)
+    start_index = max(0, end_index - 5)
+    display_years = year_options[start_index:end_index + 1]
+    start_year = int(display_years[0].split("_")[0])
+    fy_labels = [f"{start_year + i}_{start_year + i + 1}" for i in range(6)]
+    r1, r2 = get_ranges(start_year, MONTHS[selected_month_label])
+    # Only the fiscal-year tables that overlap the Apr..Mar window of fy_labels
+    window_tables = fy_registry.tables_for_range(f"{start_year}04", f"{start_year + len(fy_labels)}03")
+    return {
+        "display_years": display_years,
+        "start_year": start_year,
+        "fy_labels": fy_labels,
+        "r1": r1,
+        "r2": r2,
+        "sel_idx": len(display_years) - 1,
+        "window_suffixes": [fy["suffix"] for fy in window_tables],
+    }
+
+# Column aliases are positional (Y0, %Y0, ...) and the month bounds are bind variables,
+# so the statement text does not change with the selected year/month; split_tables
+# puts the year labels back.
+
+def split_columns(ctx, split, table):
+    """Table 1/2 columns over the per-row sums {split}i (revenue in the split) and Fi (full year)."""
+    fy_labels, sel_idx = ctx["fy_labels"], ctx["sel_idx"]
+    indexes = list(range(5))
+    if fy_labels[sel_idx] not in fy_labels[:5]:
+        indexes.append(sel_idx)
+    cols, percents = [], []
+    for i in indexes:
+        percent = f"ROUND({split}{i}*100.0/NULLIF(F{i},0),2)"
+        cols.append(f"ROUND({split}{i}/10000000,2) AS \"{table}|Y{i}\"")
+        cols.append(f"{percent} AS \"{table}|%Y{i}\"")
+        if i < 5:
+            percents.append(percent)
+    # Avg 5 Year sits after the fifth year, before the optional selected-year pair
+    cols.insert(10, f"ROUND(({'+'.join(percents)})/5,2) AS \"{table}|Avg 5 Year\"")
+    return cols
+
+def period_sums(ctx, binds):
+    """Per-row sums A{i} (Apr..month), B{i} (month+1..Mar) and F{i} (full year) for the six years."""
+    sums = []
+    for i in range(6):
+        fy, s1, e1, me = ctx["r1"][i]
+        _, s2, e2, _ = ctx["r2"][i]
+        sums.append(f"SUM(CASE WHEN yymm BETWEEN {binds(s1)} AND {binds(e1)} THEN wr ELSE 0 END) AS A{i}")
+        sums.append(f"SUM(CASE WHEN yymm BETWEEN {binds(s2)} AND {binds(e2)} THEN wr ELSE 0 END) AS B{i}")
+        sums.append(f"SUM(CASE WHEN yymm BETWEEN {binds(f'{fy}04')} AND {binds(me)} THEN wr ELSE 0 END) AS F{i}")
+    return sums
+
+def build_pages3_sql(ctx, source, sums, rollup=True):
+    """Tables 1-3 of the page, commodity rows and TOTAL rows, from a single scan of the row source.
+
+    Per-commodity sums come from GROUP BY ROLLUP(grp); the TOTAL rows and the
+    percent-of-total denominators are analytic functions over that grouped result.
+    Without ROLLUP (SQLite snapshot engine) the grand total is summed from the grouped rows.
+    Output columns are prefixed "T1|", "T2|", "T3|"; see split_tables.
+    """
+    sum_names = [f"{x}{i}" for i in range(6) for x in "ABF"]
+
+    if rollup:
+        grouped = f"""
+grouped AS (
+    SELECT grp, GROUPING(grp) AS is_total, {", ".join(sums)}
+    FROM all_data
+    GROUP BY ROLLUP(grp)
+)"""
+    else:
+        grouped = f"""
+by_grp AS (
+    SELECT grp, 0 AS is_total, {", ".join(sums)}
+    FROM all_data
+    GROUP BY grp
+),
+grouped AS (
+    SELECT * FROM by_grp
+    UNION ALL
+    SELECT NULL, 1, {", ".join(f"SUM({n})" for n in sum_names)} FROM by_grp
+)"""
+
+    # Tables 1/2 total only the eight commodity groups; Table 3 totals every row
+    commodity_sums = ", ".join(
+        f"CASE WHEN is_total = 1 THEN SUM(CASE WHEN is_total = 0 AND grp IN ({COMMODITY_GRPS}) THEN {n} ELSE 0 END) OVER () ELSE {n} END AS {n}"
+        for n in sum_names
+    )
+    year_count = len(ctx["display_years"])
+    all_totals = ", ".join(f"F{i} AS Y{i}, MAX(CASE WHEN is_total = 1 THEN F{i} END) OVER () AS YT{i}" for i in range(year_count))
+
+    cols = split_columns(ctx, "A", "T1") + split_columns(ctx, "B", "T2")
+    for i in range(year_count):
+        cols.append(f"ROUND(Y{i}/10000000,2) AS \"T3|Y{i}\"")
+        cols.append(f"CASE WHEN is_total = 1 THEN 100 ELSE ROUND(Y{i}*100.0 / NULLIF(YT{i},0),2) END AS \"T3|%Y{i}\"")
+
+    return f"""
+WITH all_data AS (
+    {source}
+),{grouped},
+totals AS (
+    SELECT grp, is_total, {commodity_sums}, {all_totals}
+    FROM grouped
+)
+SELECT CASE WHEN is_total = 1 THEN 'TOTAL' ELSE
+       DECODE(grp,'01','CEMENT','02','COAL','03','CONTAINER','04','FERTILIZER',
+              '05','FOOD GRAINS','06','IRON AND STEEL','07','OTHER GOODS','08','POL') END AS COMMODITY,
+    {", ".join(cols)}
+FROM totals
+WHERE is_total = 1 OR grp IN ({COMMODITY_GRPS})
+ORDER BY is_total, grp
+"""
+
+def pages3_fused(ctx):
+    """The single-scan frame behind pages3 Tables 1-3 (see split_tables)."""
+    # The row source (grp, yymm, zone_frm, wr) is the local snapshot, the monthly cube
+    # or the raw UNION ALL -- see query_engine. SQLite has no ROLLUP.
+    engine = query_engine.get_engine(ctx["window_suffixes"])
+    rollup = engine.name == "oracle"
+    # Table 3 totals every commodity group, so only the month window is pushed into the scan
+    window = {"yymm": (f"{ctx['start_year']}04", f"{ctx['start_year'] + len(ctx['fy_labels'])}03")}
+    binds = Binds()
+    sums = period_sums(ctx, binds)
+    return engine.read_sql(lambda source: build_pages3_sql(ctx, source, sums, rollup), {"wr": "WR"}, ctx["window_suffixes"], window, binds.values)
+
+def split_tables(ctx, df):
+    """The three page tables (COMMODITY + their own labelled columns) from the fused result."""
+    tables = []
+    for t in TABLES:
+        labels = ctx["display_years"] if t == "T3" else ctx["fy_labels"]
+        names = {}
+        for i, label in enumerate(labels):
+            names[f"{t}|Y{i}"] = label
+            names[f"{t}|%Y{i}"] = f"%{label}"
+        names[f"{t}|Avg 5 Year"] = "Avg 5 Year"
+        cols = [c for c in df.columns if c.startswith(f"{t}|")]
+        tables.append(df[["COMMODITY"] + cols].rename(columns=names))
+    return tables
@@ -5,11 +5,14 @@ import numpy as np
 from mpl_toolkits.mplot3d import Axes3D
 import matplotlib.pyplot as plt
 import seaborn as sns
-import oracledb
 import plotly.express as px
 import plotly.graph_objects as go
 import re
-from testquery import DB_HOST, DB_PORT, DB_SID, DB_USER, DB_PASSWORD
+import schema_catalog
+import fy_registry
+import query_engine
+import page_queries
+import query_cancel
 
 # Set page layout
 st.set_page_config(layout="wide")
@@ -54,19 +57,10 @@ st.markdown("""
                 <p style="color: #64748b; margin-top: 0;">Analysis of apportioned revenue by major commodity groups</p>
             </div>
         """, unsafe_allow_html=True)
-# Define fiscal years and month mappings
-years = ["25_26", "24_25", "23_24", "22_23", "21_22", "20_21", "19_20", "18_19", "17_18"]
-year_labels = {
-    "25_26": "2025-26", "24_25": "2024-25", "23_24": "2023-24",
-    "22_23": "2022-23", "21_22": "2021-22", "20_21": "2020-21",
-    "19_20": "2019-20", "18_19": "2018-19", "17_18": "2017-18"
-}
-dropdown_years = ["25_26", "24_25", "23_24", "22_23"]
-months = {
-    "April": "04", "May": "05", "June": "06", "July": "07", "August": "08",
-    "September": "09", "October": "10", "November": "11", "December": "12",
-    "January": "01", "February": "02", "March": "03"
-}
+# Define fiscal years and month mappings (discovered from the dictionary, newest first)
+year_labels = fy_registry.year_labels()
+dropdown_years = page_queries.pages4_dropdown()
+months = page_queries.MONTHS
 
 # Select fiscal year and month
 col1, col2 = st.columns(2)
@@ -76,18 +70,15 @@ with col1:
 with col2:
     selected_month = st.selectbox("Select Month", list(months.keys()), index=3)
 
-start_year = int(f"20{selected_year_code[:2]}")
-end_year = int(f"20{selected_year_code[3:]}")
-
-# Create year range and label
-previous_years = [(start_year - i - 1, start_year - i) for i in reversed(range(5))]
-previous_year_labels = [f"{y1}-{str(y2)[-2:]}" for y1, y2 in previous_years]
+# Year range, labels and tables for this selection (shared with the cache pre-warmer)
+ctx = page_queries.pages4_context(selected_year_code, selected_month)
+previous_years = ctx["previous_years"]
+previous_year_labels = ctx["previous_year_labels"]
+table_list = ctx["table_list"]
+table_suffixes = ctx["table_suffixes"]
 
 month_year_label = f"{selected_month} {selected_year_code[-2:]}"
 
-# Define table names
-table_list = [f"FOISGOODS.CARR_APMT_EXCL_ADV_{code}" for code in years]
-
 # Commodity mappings
 commodity_map = {
     "01": "Cement", "02": "Coal", "03": "Container", "04": "Fertilizers",
@@ -95,105 +86,41 @@ commodity_map = {
 }
 
 def table_has_column(table_name, column_name):
+    # Served from the shared schema catalog: one dictionary query per DDL change, not per table
     try:
-        dsn = oracledb.makedsn(DB_HOST, DB_PORT, sid=DB_SID)
-        conn = oracledb.connect(user=DB_USER, password=DB_PASSWORD, dsn=dsn)
-        query = f"""
-        SELECT COUNT(*) FROM ALL_TAB_COLUMNS
-        WHERE TABLE_NAME = '{table_name.split('.')[-1].upper()}'
-        AND OWNER = '{table_name.split('.')[0].upper()}'
-        AND COLUMN_NAME = '{column_name.upper()}'
-        """
-        df = pd.read_sql(query, con=conn)
-        return df.iloc[0, 0] > 0
+        return schema_catalog.has_column(table_name, column_name)
     except Exception as e:
         st.error(f"Error checking column in {table_name}: {e}")
         return False
-    finally:
-        if 'conn' in locals():
-            conn.close()
-
-selected_month_index = list(months.keys()).index(selected_month)
-months_to_include = list(months.items())[:selected_month_index + 1]
-cumulative_months_YYMM = [f"{start_year}{m_code}" for m_name, m_code in months_to_include]
-cumulative_months_clause = ", ".join(f"'{m}'" for m in cumulative_months_YYMM)
 
 # ---------- Query Function ----------
-def run_query(metric_sql_expr, column_name, scale_divisor=1e6, for_table3=False):
-    # Dynamically filter tables that contain the required column
-    valid_tables = [tbl for tbl in table_list if table_has_column(tbl, column_name)]
-    if not valid_tables:
-        st.warning(f"No tables found with column: {column_name}")
-        return pd.DataFrame()
-
-    previous_year_sql = ",\n        ".join([
-    f"""ROUND(SUM(CASE WHEN YYMM BETWEEN '{y1}04' AND '{y2}03' THEN VALUE ELSE 0 END)/{scale_divisor}, 3) AS \"{y1}-{str(y2)[-2:]}\""""
-    for y1, y2 in previous_years
-    ])
-
-
-    with_clause = " UNION ALL ".join([
-        f"SELECT GRP, {metric_sql_expr} AS VALUE, TO_CHAR(YYMM) AS YYMM, ZONE_FRM FROM {tbl}"
-        for tbl in valid_tables
-    ])
-
-    if for_table3:
-        query = f"""
-        WITH all_data AS (
-            {with_clause}
-        ),
-        main_data AS (
-            SELECT 
-                GRP AS COMMODITY,
-                {previous_year_sql},
-                ROUND(SUM(CASE WHEN YYMM IN ({cumulative_months_clause}) THEN VALUE ELSE 0 END)/{scale_divisor}, 3) AS "Selected_Month",
-                ROUND(SUM(CASE WHEN YYMM BETWEEN '{start_year}04' AND '{end_year}03' THEN VALUE ELSE 0 END)/{scale_divisor}, 3) AS "Selected_Year_Total"
-            FROM all_data
-            WHERE GRP IS NOT NULL
-            GROUP BY GRP
-        ),
-        final_data AS (
-            SELECT 
-                COMMODITY,
-                {', '.join([f'"{label}"' for label in previous_year_labels])},
-                "Selected_Month",
-                "Selected_Year_Total"
-            FROM main_data
-        )
-        SELECT * FROM final_data
-        ORDER BY COMMODITY
-        """
-    else:
-        query = f"""
-        WITH all_data AS (
-            {with_clause}
-        ),
-        main_data AS (
-            SELECT 
-                GRP AS COMMODITY,
-                {previous_year_sql},
-                ROUND(SUM(CASE WHEN YYMM IN ({cumulative_months_clause}) THEN VALUE ELSE 0 END)/{scale_divisor}, 3) AS "Selected_Month",
-                ROUND(SUM(CASE WHEN YYMM BETWEEN '{start_year}04' AND '{end_year}03' THEN VALUE ELSE 0 END)/{scale_divisor}, 3) AS "Selected_Year_Total"
-            FROM all_data
-            WHERE ZONE_FRM = 'WR' AND GRP IS NOT NULL
-            GROUP BY GRP
-        )
-        SELECT * FROM main_data ORDER BY COMMODITY
-        """
-
-    
-    
+def run_fused_query():
     try:
-        dsn = oracledb.makedsn(DB_HOST, DB_PORT, sid=DB_SID)
-        conn = oracledb.connect(user=DB_USER, password=DB_PASSWORD, dsn=dsn)
-        df = pd.read_sql(query, con=conn)
-        return df
+        return query_cancel.streamlit_run(lambda: page_queries.pages4_fused(ctx))
     except Exception as e:
         st.error(f"Database error: {e}")
         return pd.DataFrame()
-    finally:
-        if 'conn' in locals():
-            conn.close()
+
+def measure_frame(fused_df, measure, column_name, scale_divisor=1e6, wr_only=True):
+    """One table's frame (COMMODITY, year labels, Selected_Month, Selected_Year_Total) sliced from the fused result."""
+    # Years whose table lacks the measure's columns contribute nothing (agg_cube.raw_expr)
+    if query_engine.get_engine(table_suffixes).name == "oracle" and not any(table_has_column(tbl, column_name) for tbl in table_list):
+        st.warning(f"No tables found with column: {column_name}")
+        return pd.DataFrame()
+    if fused_df.empty:
+        return pd.DataFrame()
+
+    rows = fused_df[fused_df["WR_ROWS"] > 0] if wr_only else fused_df
+    scope = "WR" if wr_only else "ALL"
+    labels = dict(zip([f"P{i}" for i in range(len(previous_years))], previous_year_labels))
+    labels.update({"SM": "Selected_Month", "SY": "Selected_Year_Total"})
+    df = pd.DataFrame({"COMMODITY": rows["COMMODITY"].values})
+    for key, label in labels.items():
+        values = pd.to_numeric(rows[f"{measure}_{scope}_{key}"], errors="coerce").fillna(0).values
+        df[label] = (values / scale_divisor).round(3)
+    return df
+
+fused_df = run_fused_query()
 
 # ---------- Display Function ----------
 def display_table(df, title):
@@ -225,7 +152,7 @@ def display_table(df, title):
     st.dataframe(df.style.format(format_dict, na_rep="—"), use_container_width=True, hide_index=True)
 
 # ---------- Table 1: CHBL_WGHT ----------
-df1 = run_query("TO_NUMBER(CHBL_WGHT)", "CHBL_WGHT")
+df1 = measure_frame(fused_df, "CHBL_WGHT", "CHBL_WGHT")
 display_table(df1, "### Table 1: WR Apportioned vs Originating Freight (CHBL_WGHT)")
 df1 = df1.rename(columns={"Selected_Month": month_year_label})
 
@@ -321,7 +248,7 @@ fig3.update_layout(
 st.plotly_chart(fig3, use_container_width=True)
 
 # ---------- Table 2: FREIGHT ----------
-df2 = run_query("TOT_FRT_INCL_GST - TOT_GST", "TOT_GST", scale_divisor=1e7)
+df2 = measure_frame(fused_df, "FREIGHT", "TOT_GST", scale_divisor=1e7)
 display_table(df2, "### Table 2: WR Apportioned vs Originating Freight (Freight without GST)")
 df2 = df2.rename(columns={"Selected_Month": month_year_label})
 
@@ -417,7 +344,7 @@ fig3.update_layout(
 
 st.plotly_chart(fig3, use_container_width=True)
 # ---------- Table 3: WR ----------
-df3 = run_query("TO_NUMBER(WR)", "WR", scale_divisor=1e7, for_table3=True)
+df3 = measure_frame(fused_df, "WR", "WR", scale_divisor=1e7, wr_only=False)
 display_table(df3, "### Table 3: WR Apportioned vs Originating Freight (WR)")
 df3 = df3.rename(columns={"Selected_Month": month_year_label})
 
@@ -0,0 +1,175 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import pandas as pd
+
+# --- Snapshot Settings ---
+# Per-fiscal-year Parquet files of the monthly (GRP, YYMM, ZONE_FRM) aggregates
+SNAPSHOT_DIR = os.getenv("ANALYTICS_SNAPSHOT_DIR", "snapshots")
+MANIFEST_FILE = "manifest.json"
+SNAPSHOT_COMPRESSION = "zstd"
+# Closed fiscal years never go stale; the live year's file is trusted for this long (seconds)
+SNAPSHOT_MAX_AGE = int(os.getenv("ANALYTICS_SNAPSHOT_MAX_AGE", 900))
+MEASURE_COLUMNS = ["CHBL_WGHT", "FREIGHT", "WR", "TOT_GST", "ROW_COUNT"]
+
+_engine_lock = threading.Lock()
+_engine = {"key": None, "db": None}
+
+# ------------------- Manifest -------------------
+
+def _manifest_path():
+    return os.path.join(SNAPSHOT_DIR, MANIFEST_FILE)
+
+def load_manifest():
+    try:
+        with open(_manifest_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"years": {}}
+
+def _save_manifest(manifest):
+    tmp = _manifest_path() + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    os.replace(tmp, _manifest_path())
+
+def manifest_years():
+    """Registry-shaped entries for the years in the snapshot, newest first (offline fallback)."""
+    years = [entry["fiscal_year"] for entry in load_manifest()["years"].values()]
+    return sorted(years, key=lambda fy: fy["start_year"], reverse=True)
+
+def is_fresh(suffixes):
+    """True when every requested year has a snapshot file that can be trusted right now."""
+    try:
+        import pyarrow  # noqa: F401  (snapshot engine needs pyarrow)
+    except ImportError:
+        return False
+    years = load_manifest()["years"]
+    now = time.time()
+    for suffix in suffixes:
+        entry = years.get(suffix)
+        if not entry or not os.path.exists(os.path.join(SNAPSHOT_DIR, entry["file"])):
+            return False
+        if not entry["frozen"] and now - entry["written_at"] > SNAPSHOT_MAX_AGE:
+            return False
+    return True
+
+# ------------------- Export -------------------
+
+def _fetch_year(conn, fy):
+    """Monthly aggregates for one year: from the cube when built, else straight from the raw table."""
+    import agg_cube
+    import sql_templates
+    if fy["suffix"] in agg_cube.built_suffixes(conn):
+        sql = f"""
+            SELECT grp, yymm, zone_frm, chbl_wght, freight, wr, tot_gst, row_count
+            FROM {agg_cube.CUBE_TABLE} WHERE fy_suffix = :fy
+        """
+        return sql_templates.read_sql(sql, conn, {"fy": fy["suffix"]}, profile="bulk")
+    return sql_templates.read_sql(agg_cube.aggregate_select(fy["table"]), conn, profile="bulk")
+
+def export_snapshot(suffixes=None):
+    """Write one compressed Parquet file per fiscal year and update the manifest."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from db_utils import DatabaseConnection
+    import fy_registry
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    registry = fy_registry.fiscal_years()
+    live_suffix = registry[0]["suffix"] if registry else None
+    manifest = load_manifest()
+    with DatabaseConnection() as conn:
+        for fy in registry:
+            if suffixes is not None and fy["suffix"] not in suffixes:
+                continue
+            start = time.perf_counter()
+            df = _fetch_year(conn, fy)
+            df.columns = [c.upper() for c in df.columns]
+            df["YYMM"] = df["YYMM"].astype("int64").astype(str)
+            for col in MEASURE_COLUMNS:
+                df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+            file_name = f"agg_{fy['suffix']}.parquet"
+            tmp = os.path.join(SNAPSHOT_DIR, file_name + ".tmp")
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp, compression=SNAPSHOT_COMPRESSION)
+            os.replace(tmp, os.path.join(SNAPSHOT_DIR, file_name))
+            manifest["years"][fy["suffix"]] = {
+                "file": file_name,
+                "rows": len(df),
+                "written_at": time.time(),
+                "frozen": fy["suffix"] != live_suffix,
+                "fiscal_year": fy,
+            }
+            print(f"{fy['suffix']}: {len(df)} rows -> {file_name} ({time.perf_counter() - start:.1f}s)")
+    _save_manifest(manifest)
+
+# ------------------- Offline engine -------------------
+
+def load_frame(suffixes):
+    """Concatenated snapshot rows for the given years, read via memory mapping."""
+    import pyarrow.parquet as pq
+    years = load_manifest()["years"]
+    frames = []
+    for suffix in suffixes:
+        table = pq.read_table(os.path.join(SNAPSHOT_DIR, years[suffix]["file"]), memory_map=True)
+        frame = table.to_pandas()
+        frame["FY_SUFFIX"] = suffix
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+def _decode(expr, *args):
+    """Oracle DECODE(expr, search1, result1, ..., [default]) for SQLite."""
+    default = args[-1] if len(args) % 2 else None
+    for search, result in zip(args[0::2], args[1::2]):
+        if expr == search:
+            return result
+    return default
+
+def _engine_db():
+    """In-memory SQLite copy of the whole snapshot, rebuilt when the manifest changes."""
+    years = load_manifest()["years"]
+    key = tuple(sorted((s, e["written_at"]) for s, e in years.items()))
+    if _engine["key"] != key:
+        db = sqlite3.connect(":memory:", check_same_thread=False)
+        db.create_function("DECODE", -1, _decode)
+        load_frame(sorted(years)).to_sql("AGG", db, index=False)
+        db.execute("CREATE INDEX idx_agg_fy ON AGG(FY_SUFFIX, YYMM)")
+        _engine["db"], _engine["key"] = db, key
+    return _engine["db"]
+
+def source_sql(measures, suffixes, filters, binds):
+    """Snapshot counterpart of agg_cube.source_sql (YYMM is stored as text here)."""
+    import agg_cube
+    filters = filters or {}
+    suffixes = agg_cube.prune_suffixes(suffixes, filters)
+    cols = ", ".join(f"{m} AS {alias}" for alias, m in measures.items())
+    conds = [f"FY_SUFFIX IN ({binds.in_list(suffixes)})"] + agg_cube.pushdown_conditions(filters, binds, yymm_as_text=True)
+    return f"SELECT FY_SUFFIX, GRP, YYMM, ZONE_FRM, {cols} FROM AGG WHERE {' AND '.join(conds)}"
+
+def read_sql(build_query, measures, suffixes, filters=None, params=None):
+    """Run a page query (see agg_cube.read_sql) against the local snapshot."""
+    import sql_templates
+    binds = sql_templates.Binds("f")
+    sql = build_query(source_sql(measures, suffixes, filters, binds))
+    with _engine_lock:
+        return sql_templates.read_sql(sql, _engine_db(), {**(params or {}), **binds.values})
+
+if __name__ == "__main__":
+    # python parquet_snapshot.py export [24_25 ...] | info
+    if len(sys.argv) < 2 or sys.argv[1] not in ("export", "info"):
+        print("Usage: python parquet_snapshot.py export [fiscal-year suffix ...] | info")
+        sys.exit(1)
+    if sys.argv[1] == "export":
+        from db_utils import close_pool
+        try:
+            export_snapshot(sys.argv[2:] or None)
+        finally:
+            close_pool()
+    else:
+        for suffix, entry in sorted(load_manifest()["years"].items()):
+            age = time.time() - entry["written_at"]
+            state = "frozen" if entry["frozen"] else f"live, {age / 60:.0f} min old"
+            print(f"{suffix}: {entry['rows']} rows in {entry['file']} ({state})")
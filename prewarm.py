@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import page_queries
+
+# --- Pre-warm Settings ---
+# Runs every dropdown combination of page1, pages3 and pages4 through the same query
+# builders the pages use, so their results sit in result_cache (and its disk tier)
+# before anyone asks. Closed-year combinations are cache hits after the first run.
+#
+# Nothing starts it implicitly: schedule it as its own job, e.g. after the aggregate refresh
+#   python refresh_aggregates.py && python prewarm.py
+# or keep one process re-running it every PREWARM_INTERVAL with python prewarm.py --loop.
+# The Streamlit server picks the results up from the disk tier on its next lookup.
+PREWARM_WORKERS = int(os.getenv("PREWARM_WORKERS", 2))
+# --loop re-run interval (seconds); nightly by default
+PREWARM_INTERVAL = int(os.getenv("PREWARM_INTERVAL", 24 * 3600))
+
+_last_run = {"started_at": None, "finished_at": None, "combos": [], "failures": 0}
+
+def combinations(pages=None):
+    """(page, label, callable) for every dropdown combination of the selected pages."""
+    pages = pages or ("page1", "pages3", "pages4")
+    combos = []
+    if "page1" in pages:
+        for suffix in page_queries.page1_dropdown():
+            combos.append(("page1", suffix, lambda s=suffix: page_queries.page1_metrics(page_queries.page1_years(s))))
+    if "pages3" in pages:
+        for year in page_queries.pages3_dropdown():
+            for month in page_queries.MONTHS:
+                combos.append(("pages3", f"{year} {month}", lambda y=year, m=month: page_queries.pages3_fused(page_queries.pages3_context(y, m))))
+    if "pages4" in pages:
+        for suffix in page_queries.pages4_dropdown():
+            for month in page_queries.MONTHS:
+                combos.append(("pages4", f"{suffix} {month}", lambda s=suffix, m=month: page_queries.pages4_fused(page_queries.pages4_context(s, m))))
+    return combos
+
+def run(pages=None, workers=None, progress=print):
+    """Compute every combination with bounded concurrency; returns per-combination timings."""
+    combos = combinations(pages)
+    total = len(combos)
+    results = []
+    _last_run.update(started_at=time.time(), finished_at=None, combos=results, failures=0)
+
+    def timed(combo):
+        page, label, func = combo
+        start = time.perf_counter()
+        try:
+            func()
+            return page, label, time.perf_counter() - start, None
+        except Exception as e:
+            return page, label, time.perf_counter() - start, e
+
+    with ThreadPoolExecutor(max_workers=max(1, workers or PREWARM_WORKERS), thread_name_prefix="prewarm") as pool:
+        futures = [pool.submit(timed, combo) for combo in combos]
+        for done, future in enumerate(as_completed(futures), start=1):
+            page, label, seconds, error = future.result()
+            results.append({"page": page, "combo": label, "seconds": seconds, "error": str(error) if error else None})
+            if error:
+                _last_run["failures"] += 1
+                progress(f"[{done}/{total}] {page} {label}: failed after {seconds:.1f}s ({error})")
+            else:
+                progress(f"[{done}/{total}] {page} {label}: {seconds:.2f}s")
+    _last_run["finished_at"] = time.time()
+    return results
+
+def last_run():
+    """Start/finish time, per-combination durations and failure count of the latest run."""
+    return dict(_last_run)
+
+def run_forever(pages=None):
+    """A run now, then one every PREWARM_INTERVAL seconds; a failed run does not stop the loop."""
+    while True:
+        try:
+            report(run(pages))
+        except Exception as e:
+            print(f"Pre-warm run failed: {e}")
+        time.sleep(PREWARM_INTERVAL)
+
+def report(timings):
+    slowest = sorted(timings, key=lambda r: r["seconds"], reverse=True)[:5]
+    print("Slowest:", ", ".join(f"{r['page']} {r['combo']} {r['seconds']:.1f}s" for r in slowest))
+
+if __name__ == "__main__":
+    # python prewarm.py [--loop] [page1 pages3 pages4]
+    from db_utils import close_pool
+    args = sys.argv[1:]
+    loop = "--loop" in args
+    pages = [a for a in args if a != "--loop"] or None
+    try:
+        if loop:
+            run_forever(pages)
+        else:
+            report(run(pages))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_pool()
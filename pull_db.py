@@ -1,44 +1,30 @@
 import oracledb
-import pandas as pd # Import the pandas library
 import sys
-import os
 
-from testquery import DB_HOST, DB_PORT, DB_SID, DB_USER, DB_PASSWORD
+from db_utils import get_db_connection, close_pool, DSN, DB_USER
+import streaming_export
 
 # --- Table Details ---
 TARGET_SCHEMA = "FOISGOODS"
 TARGET_TABLE = "carr_apmt_excl_adv_24_25"
 
-# --- CSV Output File ---
-OUTPUT_CSV_FILENAME = f"{TARGET_TABLE}_data.csv" # e.g., WR_TRAIN_LIST_data.csv
-
-# Construct the DSN (Data Source Name) string for SID connection
-DSN = f"{DB_HOST}:{DB_PORT}/{DB_SID}"
-
-# --- Initialize Oracle Client for Thick Mode ---
-print("Initializing Oracle Client for Thick Mode...")
-try:
-    oracledb.init_oracle_client(lib_dir=INSTANT_CLIENT_PATH)
-    print(f"Oracle Client initialized successfully from: {INSTANT_CLIENT_PATH}")
-except oracledb.Error as e:
-    error_obj = e.args[0]
-    print(f"\n--- Oracle Client Initialization Error ---")
-    print(f"Error Message: {error_obj.message}")
-    print(f"Please ensure Instant Client is installed correctly at:")
-    print(f"  {INSTANT_CLIENT_PATH}")
-    print(f"And that the path contains the necessary DLLs (like oci.dll).")
+# --- Output File ---
+# python pull_db.py [csv | csv.gz | csv.zst | parquet | arrow]   (default: csv)
+OUTPUT_FORMAT = sys.argv[1] if len(sys.argv) > 1 else "csv"
+if OUTPUT_FORMAT not in streaming_export.EXPORT_FORMATS or OUTPUT_FORMAT == "xlsx":
+    print(f"Unknown format '{OUTPUT_FORMAT}'. Use one of: csv, csv.gz, csv.zst, parquet, arrow")
     sys.exit(1)
+OUTPUT_FILENAME = f"{TARGET_TABLE}_data{streaming_export.EXPORT_FORMATS[OUTPUT_FORMAT]['suffix']}" # e.g., carr_apmt_excl_adv_24_25_data.csv
 
 print(f"\nAttempting to connect to Oracle Database: {DSN} as user: {DB_USER}")
 print("-" * 30)
 
 # --- Connection and Data Pull Logic ---
 connection = None
-cursor = None
 
 try:
     print("Establishing database connection...")
-    connection = oracledb.connect(user=DB_USER, password=DB_PASSWORD, dsn=DSN)
+    connection = get_db_connection()
     print("Successfully connected to the Oracle Database!")
 
     # Define the SQL query to select all data from your table
@@ -46,26 +32,15 @@ try:
     query = f"SELECT * FROM {TARGET_SCHEMA}.{TARGET_TABLE}"
 
     print(f"\nExecuting query to fetch data from {TARGET_SCHEMA}.{TARGET_TABLE}...")
-    cursor = connection.cursor()
-    cursor.execute(query)
-
-    # Fetch all rows
-    rows = cursor.fetchall()
 
-    # Get column names from the cursor description
-    column_names = [col[0] for col in cursor.description]
+    # Fetch columnar batches and write each one as it arrives (see arrow_fetch, streaming_export)
+    stats = streaming_export.write(OUTPUT_FORMAT, streaming_export.fetch_batches(OUTPUT_FORMAT, query, connection), OUTPUT_FILENAME)
 
-    if not rows:
+    if not stats["rows"]:
         print(f"No data found in table {TARGET_SCHEMA}.{TARGET_TABLE}.")
     else:
-        print(f"Fetched {len(rows)} rows.")
-
-        # Create a pandas DataFrame
-        df = pd.DataFrame(rows, columns=column_names)
-
-        # Save DataFrame to CSV
-        df.to_csv(OUTPUT_CSV_FILENAME, index=False, encoding='utf-8')
-        print(f"\nData successfully saved to '{OUTPUT_CSV_FILENAME}'")
+        print(f"Fetched {stats['rows']} rows.")
+        print(f"\nData successfully saved to '{OUTPUT_FILENAME}' ({streaming_export.format_stats(stats)})")
 
 except oracledb.Error as e:
     error_obj = e.args[0]
@@ -86,9 +61,7 @@ except Exception as e:
 
 finally:
     print("\n--- Closing connections ---")
-    if cursor:
-        cursor.close()
-        print("Cursor closed.")
     if connection:
         connection.close()
-        print("Connection closed.")
\ No newline at end of file
+        print("Connection closed.")
+    close_pool()
\ No newline at end of file
@@ -0,0 +1,164 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# --- Query Cancellation ---
+# A Streamlit rerun (new dropdown selection) only stops the old script at its next st.*
+# call, so a page blocked in a long Oracle query would hold its connection until the
+# query finished. Page queries therefore run as a "run": the script thread waits in short
+# polls and touches a placeholder between them, which is where Streamlit raises its
+# rerun/stop exception. The run is then cancelled: every connection it registered gets
+# connection.cancel() (the statement fails with ORA-01013 and the connection goes back
+# to the pool usable). Starting a run also cancels the session's previous run.
+POLL_SECONDS = 0.25
+
+class QueryCancelled(Exception):
+    """The run this query belonged to was superseded or stopped."""
+
+class Run:
+    def __init__(self, session_key=None):
+        self.session_key = session_key
+        self.cancelled = False
+        self.connections = set()
+        self.lock = threading.Lock()
+
+    def cancel(self):
+        """Break every statement currently executing for this run."""
+        with self.lock:
+            self.cancelled = True
+            connections = list(self.connections)
+        for conn in connections:
+            try:
+                conn.cancel()
+            except Exception as e:
+                print(f"Query cancel failed: {e}")
+        with _lock:
+            _stats["cancelled_runs"] += 1
+            _stats["cancelled_statements"] += len(connections)
+
+_local = threading.local()
+_lock = threading.Lock()
+_sessions = {}    # session key -> latest Run
+_stats = {"runs": 0, "superseded": 0, "cancelled_runs": 0, "cancelled_statements": 0}
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="page-query")
+
+def current():
+    """The Run of the calling thread, or None outside one (scripts, pre-warm)."""
+    return getattr(_local, "run", None)
+
+class activate:
+    """Make run the current Run of this thread (used for worker threads, see fanout)."""
+
+    def __init__(self, run):
+        self.run = run
+
+    def __enter__(self):
+        self.previous = current()
+        _local.run = self.run
+        return self.run
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _local.run = self.previous
+
+class track:
+    """Register conn with the current Run while a statement executes on it.
+
+    Raises QueryCancelled instead of starting work for a run that is already cancelled,
+    and turns the driver's cancellation error into QueryCancelled.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        run = current()
+        if run is not None:
+            with run.lock:
+                if run.cancelled:
+                    raise QueryCancelled("query superseded by a newer selection")
+                run.connections.add(self.conn)
+        return self.conn
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        run = current()
+        if run is None:
+            return False
+        with run.lock:
+            run.connections.discard(self.conn)
+            cancelled = run.cancelled
+        if cancelled and exc_type is not None and not issubclass(exc_type, QueryCancelled):
+            raise QueryCancelled("query superseded by a newer selection") from exc_val
+        return False
+
+def is_cancelled():
+    run = current()
+    return run is not None and run.cancelled
+
+def _begin(session_key):
+    run = Run(session_key)
+    with _lock:
+        _stats["runs"] += 1
+        previous = _sessions.get(session_key) if session_key is not None else None
+        if session_key is not None:
+            _sessions[session_key] = run
+    if previous is not None and not previous.cancelled:
+        with _lock:
+            _stats["superseded"] += 1
+        previous.cancel()
+    return run
+
+def _finish(run):
+    with _lock:
+        if run.session_key is not None and _sessions.get(run.session_key) is run:
+            del _sessions[run.session_key]
+
+def run_cancellable(func, session_key=None, on_wait=None, poll=POLL_SECONDS):
+    """Run func() on a worker thread as a new Run; the caller waits in polls.
+
+    on_wait(elapsed_seconds) is called between polls. If it raises (a Streamlit
+    rerun/stop) or the caller is interrupted, the run's statements are cancelled and
+    the exception propagates.
+    """
+    run = _begin(session_key)
+
+    def work():
+        with activate(run):
+            return func()
+
+    future = _executor.submit(work)
+    start = time.perf_counter()
+    try:
+        while True:
+            try:
+                return future.result(timeout=poll)
+            except FutureTimeout:
+                if on_wait is not None:
+                    on_wait(time.perf_counter() - start)
+    except BaseException:
+        if not future.done():
+            run.cancel()
+        raise
+    finally:
+        _finish(run)
+
+def streamlit_run(func, message="Running query"):
+    """run_cancellable for a page: keyed by the Streamlit session, with an elapsed-time note."""
+    import streamlit as st
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        session_key = ctx.session_id if ctx is not None else None
+    except ImportError:
+        session_key = None
+    placeholder = st.empty()
+    result = run_cancellable(func, session_key, lambda elapsed: placeholder.caption(f"⏳ {message}… {elapsed:.0f}s"))
+    # Not in a finally: after a rerun exception Streamlit redraws the page anyway
+    placeholder.empty()
+    return result
+
+def stats():
+    """Runs started, runs superseded by a newer one, and statements cancelled."""
+    with _lock:
+        snapshot = dict(_stats)
+        snapshot["active_sessions"] = len(_sessions)
+    return snapshot
@@ -0,0 +1,96 @@
+import os
+import parquet_snapshot
+import query_cancel
+import result_cache
+import single_flight
+
+# --- Engine Selection ---
+# auto     - local Parquet snapshot when it is fresh for every requested year, else Oracle
+# oracle   - always query the database (cube or raw tables, see agg_cube)
+# snapshot - always use the local snapshot (offline / benchmarking)
+ANALYTICS_ENGINE = os.getenv("ANALYTICS_ENGINE", "auto")
+
+class Engine:
+    """Both engines give the same answers, so they share one result cache (see result_cache).
+
+    On a miss, identical concurrent requests are coalesced (see single_flight): one
+    session runs the query, the others wait for its result. If the session running it
+    moves on and its run is cancelled (see query_cancel), the waiters run it themselves.
+    """
+    name = None
+
+    def read_sql(self, build_query, measures, suffixes, filters=None, params=None):
+        key = result_cache.make_key(build_query, measures, suffixes, filters, params)
+        df = result_cache.get(key)
+        if df is None:
+            def run():
+                result = self._read_sql(build_query, measures, suffixes, filters, params)
+                result_cache.put(key, result, suffixes)
+                return result
+            df, leader = _shared(key, run)
+            if not leader:
+                df = df.copy()
+        return df
+
+    def read_sql_per_year(self, build_query, measures, suffixes, filters=None, params=None):
+        """One frame per fiscal year, in suffixes order; only uncached years are queried."""
+        keys = {s: result_cache.make_key(build_query, measures, [s], filters, params) for s in suffixes}
+        frames = {s: result_cache.get(keys[s]) for s in suffixes}
+        missing = [s for s in suffixes if frames[s] is None]
+        if missing:
+            def run():
+                results = self._read_sql_per_year(build_query, measures, missing, filters, params)
+                for suffix, df in zip(missing, results):
+                    result_cache.put(keys[suffix], df, [suffix])
+                return results
+            results, leader = _shared("|".join(keys[s] for s in missing), run)
+            for suffix, df in zip(missing, results):
+                frames[suffix] = df if leader else df.copy()
+        return [frames[s] for s in suffixes]
+
+def _shared(key, run):
+    """single_flight.do, retried when another session's cancelled run was leading it."""
+    while True:
+        try:
+            return single_flight.do(key, run)
+        except query_cancel.QueryCancelled:
+            if query_cancel.is_cancelled():
+                raise
+
+class OracleEngine(Engine):
+    name = "oracle"
+
+    def _read_sql(self, build_query, measures, suffixes, filters, params):
+        from db_utils import DatabaseConnection
+        import agg_cube
+        with DatabaseConnection() as conn, query_cancel.track(conn):
+            return agg_cube.read_sql(conn, build_query, measures, suffixes, filters, params)
+
+    def _read_sql_per_year(self, build_query, measures, suffixes, filters, params):
+        # One statement per fiscal year, run concurrently on pooled connections (see fanout)
+        import agg_cube
+        import fanout
+        return fanout.fan_out(
+            lambda conn, suffix: agg_cube.read_sql(conn, build_query, measures, [suffix], filters, params),
+            suffixes
+        )
+
+class SnapshotEngine(Engine):
+    name = "snapshot"
+
+    def _read_sql(self, build_query, measures, suffixes, filters, params):
+        return parquet_snapshot.read_sql(build_query, measures, suffixes, filters, params)
+
+    def _read_sql_per_year(self, build_query, measures, suffixes, filters, params):
+        # Local SQLite answers in milliseconds; no point spreading it over threads
+        return [self._read_sql(build_query, measures, [suffix], filters, params) for suffix in suffixes]
+
+def get_engine(suffixes):
+    """Engine that should answer page queries touching these fiscal years."""
+    # First page render after a restart: pull persisted results back into memory
+    result_cache.warm()
+    if ANALYTICS_ENGINE == "snapshot":
+        return SnapshotEngine()
+    if ANALYTICS_ENGINE == "auto" and parquet_snapshot.is_fresh(suffixes):
+        return SnapshotEngine()
+    return OracleEngine()
@@ -0,0 +1,121 @@
+import sys
+import time
+from db_utils import get_db_connection, close_pool
+import fy_registry
+import agg_cube
+import result_cache
+
+# --- Refresh State ---
+# One row per (fiscal year, month) already aggregated into the cube, with the
+# signature it had at the time. Closed fiscal years are frozen and never re-read.
+STATE_TABLE = "CARR_APMT_AGG_STATE"
+
+def ensure_state_table(cursor):
+    cursor.execute("SELECT table_name FROM user_tables WHERE table_name = :name", name=STATE_TABLE)
+    if cursor.fetchone():
+        return
+    cursor.execute(f"""
+        CREATE TABLE {STATE_TABLE} (
+            fy_suffix VARCHAR2(5) NOT NULL,
+            yymm NUMBER(6) NOT NULL,
+            row_count NUMBER,
+            max_scn NUMBER,
+            frozen CHAR(1) DEFAULT 'N',
+            refreshed_at TIMESTAMP DEFAULT SYSTIMESTAMP,
+            PRIMARY KEY (fy_suffix, yymm)
+        )
+    """)
+
+def is_frozen(cursor, fy):
+    cursor.execute(f"SELECT COUNT(*) FROM {STATE_TABLE} WHERE fy_suffix = :fy AND frozen = 'Y'", fy=fy["suffix"])
+    return cursor.fetchone()[0] > 0
+
+def stored_signatures(cursor, fy):
+    cursor.execute(f"SELECT yymm, row_count, max_scn FROM {STATE_TABLE} WHERE fy_suffix = :fy", fy=fy["suffix"])
+    return {yymm: (row_count, max_scn) for yymm, row_count, max_scn in cursor}
+
+def current_signatures(cursor, fy):
+    """Row count and highest ORA_ROWSCN per month; any insert/update/delete changes one of them."""
+    cursor.execute(f"""
+        SELECT TO_NUMBER(yymm), COUNT(*), MAX(ORA_ROWSCN)
+        FROM {fy["table"]}
+        GROUP BY TO_NUMBER(yymm)
+    """)
+    return {yymm: (row_count, max_scn) for yymm, row_count, max_scn in cursor}
+
+def save_signature(cursor, fy, yymm, signature, frozen="N"):
+    cursor.execute(f"""
+        MERGE INTO {STATE_TABLE} s
+        USING (SELECT :fy AS fy_suffix, :yymm AS yymm FROM dual) k
+        ON (s.fy_suffix = k.fy_suffix AND s.yymm = k.yymm)
+        WHEN MATCHED THEN UPDATE SET row_count = :row_count, max_scn = :max_scn,
+            frozen = :frozen, refreshed_at = SYSTIMESTAMP
+        WHEN NOT MATCHED THEN INSERT (fy_suffix, yymm, row_count, max_scn, frozen)
+            VALUES (:fy, :yymm, :row_count, :max_scn, :frozen)
+    """, fy=fy["suffix"], yymm=yymm, row_count=signature[0], max_scn=signature[1], frozen=frozen)
+
+def freeze_year(conn, cursor, fy):
+    """Final full aggregate of a closed fiscal year, then mark it frozen."""
+    rows = agg_cube.build_year(cursor, fy)
+    cursor.execute(f"DELETE FROM {STATE_TABLE} WHERE fy_suffix = :fy", fy=fy["suffix"])
+    # A year with no rows still needs a frozen marker, or every run would rebuild it
+    signatures = current_signatures(cursor, fy) or {0: (0, None)}
+    for yymm, signature in signatures.items():
+        save_signature(cursor, fy, yymm, signature, frozen="Y")
+    conn.commit()
+    return rows
+
+def refresh_live_year(conn, cursor, fy):
+    """Re-aggregate only the months of the live year whose signature changed. Returns months rebuilt."""
+    stored = stored_signatures(cursor, fy)
+    current = current_signatures(cursor, fy)
+    changed = sorted(yymm for yymm in current if stored.get(yymm) != current[yymm])
+    vanished = sorted(set(stored) - set(current))
+    for yymm in changed:
+        agg_cube.build_month(cursor, fy, yymm)
+        save_signature(cursor, fy, yymm, current[yymm])
+        conn.commit()
+    for yymm in vanished:
+        agg_cube.build_month(cursor, fy, yymm)
+        cursor.execute(f"DELETE FROM {STATE_TABLE} WHERE fy_suffix = :fy AND yymm = :yymm", fy=fy["suffix"], yymm=yymm)
+        conn.commit()
+    return changed + vanished
+
+def refresh():
+    """Idempotent incremental refresh: safe to run every few minutes."""
+    years = fy_registry.fiscal_years()
+    if not years:
+        print("No fiscal-year tables found.")
+        return
+    live, closed = years[0], years[1:]
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        agg_cube.ensure_cube_table(cursor)
+        ensure_state_table(cursor)
+        for fy in closed:
+            if is_frozen(cursor, fy):
+                continue
+            start = time.perf_counter()
+            rows = freeze_year(conn, cursor, fy)
+            print(f"{fy['suffix']}: frozen ({rows} cube rows, {time.perf_counter() - start:.1f}s)")
+        start = time.perf_counter()
+        months = refresh_live_year(conn, cursor, live)
+        if months:
+            # Cached live-year results are stale now, here and in the Streamlit server
+            result_cache.invalidate([live["suffix"]])
+            print(f"{live['suffix']}: re-aggregated {', '.join(map(str, months))} ({time.perf_counter() - start:.1f}s)")
+        else:
+            print(f"{live['suffix']}: up to date ({time.perf_counter() - start:.1f}s)")
+        cursor.close()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    try:
+        refresh()
+    except Exception as e:
+        print(f"Aggregate refresh failed: {e}")
+        sys.exit(1)
+    finally:
+        close_pool()
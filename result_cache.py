@@ -0,0 +1,172 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+import fy_registry
+import disk_cache
+
+# --- Result Cache Settings ---
+# Page query results shared by every Streamlit session in the process, keyed by the
+# normalized page SQL, its measures, fiscal years, pushdown filters and bind values.
+# Results touching only closed fiscal years never expire; anything touching the live
+# (newest) year is kept for RESULT_CACHE_LIVE_TTL seconds.
+RESULT_CACHE_LIVE_TTL = int(os.getenv("RESULT_CACHE_LIVE_TTL", 300))
+# Least recently used entries are dropped beyond this size
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_MB", 256)) * 1024 * 1024
+# Every result is also written to the disk tier (see disk_cache) so it survives restarts;
+# set RESULT_CACHE_DISK=0 to keep results in memory only
+RESULT_CACHE_DISK = os.getenv("RESULT_CACHE_DISK", "1") == "1"
+# How often (seconds) to look for invalidations made by other processes (see disk_cache)
+RESULT_CACHE_SYNC_INTERVAL = float(os.getenv("RESULT_CACHE_SYNC_INTERVAL", 5))
+
+_lock = threading.Lock()
+_entries = OrderedDict()    # key -> {"df", "bytes", "suffixes", "expires_at", "stored_at"}
+_stats = {"hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+_warmed = {"done": False}
+_sync = {"checked_at": 0.0, "seen": {}}    # seen: suffix -> newest marker already applied
+
+def make_key(build_query, measures, suffixes, filters=None, params=None):
+    """Cache key for a page query, independent of the row source that will answer it."""
+    sql = " ".join(build_query("{row_source}").split())
+    parts = [
+        sql,
+        repr(sorted(measures.items())),
+        repr(list(suffixes)),
+        repr(sorted((filters or {}).items())),
+        repr(sorted((params or {}).items())),
+    ]
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+def ttl_for(suffixes):
+    """Seconds a result may be served for, or None when it only touches closed years."""
+    years = fy_registry.suffixes()
+    live = years[0] if years else None
+    if live is not None and live in suffixes:
+        return RESULT_CACHE_LIVE_TTL
+    return None
+
+def _store(key, df, suffixes, ttl):
+    expires_at = time.monotonic() + ttl if ttl is not None else None
+    size = int(df.memory_usage(deep=True).sum())
+    if size > RESULT_CACHE_MAX_BYTES:
+        return
+    with _lock:
+        _entries[key] = {"df": df, "bytes": size, "suffixes": frozenset(suffixes), "expires_at": expires_at,
+                         "stored_at": time.time()}
+        _entries.move_to_end(key)
+        total = sum(entry["bytes"] for entry in _entries.values())
+        while total > RESULT_CACHE_MAX_BYTES:
+            _, evicted = _entries.popitem(last=False)
+            total -= evicted["bytes"]
+            _stats["evictions"] += 1
+
+def _sync_invalidations():
+    """Drop entries that another process invalidated after they were stored."""
+    now = time.monotonic()
+    with _lock:
+        if now - _sync["checked_at"] < RESULT_CACHE_SYNC_INTERVAL:
+            return
+        _sync["checked_at"] = now
+    try:
+        marks = disk_cache.invalidations()
+    except Exception as e:
+        print(f"Result cache: invalidation check failed ({e})")
+        return
+    with _lock:
+        fresh = {suffix: at for suffix, at in marks.items() if at > _sync["seen"].get(suffix, 0.0)}
+        if not fresh:
+            return
+        _sync["seen"].update(fresh)
+        doomed = [
+            key for key, entry in _entries.items()
+            if any(entry["stored_at"] <= at and (suffix == "*" or suffix in entry["suffixes"]) for suffix, at in fresh.items())
+        ]
+        for key in doomed:
+            del _entries[key]
+        _stats["invalidations"] += len(doomed)
+
+def get(key):
+    """Cached DataFrame (a copy, safe to mutate) or None. Falls back to the disk tier."""
+    _sync_invalidations()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry["expires_at"] is not None and time.monotonic() >= entry["expires_at"]:
+            del _entries[key]
+            _stats["expired"] += 1
+            entry = None
+        if entry is not None:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return entry["df"].copy()
+    found = disk_cache.get(key) if RESULT_CACHE_DISK else None
+    if found is None:
+        with _lock:
+            _stats["misses"] += 1
+        return None
+    df, suffixes, expires_at = found
+    _store(key, df, suffixes, None if expires_at is None else max(expires_at - time.time(), 0))
+    with _lock:
+        _stats["disk_hits"] += 1
+    return df.copy()
+
+def put(key, df, suffixes):
+    """Store a result in memory and on disk; the cache keeps its own copy."""
+    ttl = ttl_for(suffixes)
+    stored = df.copy()
+    _store(key, stored, suffixes, ttl)
+    if RESULT_CACHE_DISK:
+        try:
+            disk_cache.put(key, stored, list(suffixes), ttl)
+        except Exception as e:
+            print(f"Result cache: disk write failed ({e})")
+
+def warm():
+    """Load the most recently used disk entries into memory, once per process."""
+    with _lock:
+        if _warmed["done"] or not RESULT_CACHE_DISK:
+            return 0
+        _warmed["done"] = True
+    try:
+        entries = disk_cache.warm_entries(RESULT_CACHE_MAX_BYTES)
+    except Exception as e:
+        print(f"Result cache: warm-load failed ({e})")
+        return 0
+    for key, df, suffixes, expires_at in entries:
+        _store(key, df, suffixes, None if expires_at is None else max(expires_at - time.time(), 0))
+    return len(entries)
+
+def invalidate(suffixes=None):
+    """Drop results touching any of these fiscal years (default: everything), in memory and on disk.
+
+    Other processes (the Streamlit server when this runs from a CLI) drop theirs on
+    their next lookup, through the marker left in disk_cache.
+    """
+    with _lock:
+        doomed = [key for key, entry in _entries.items() if suffixes is None or entry["suffixes"] & set(suffixes)]
+        for key in doomed:
+            del _entries[key]
+        _stats["invalidations"] += len(doomed)
+    try:
+        disk_cache.mark_invalidated(suffixes)
+        if RESULT_CACHE_DISK:
+            disk_cache.invalidate(suffixes)
+    except Exception as e:
+        print(f"Result cache: disk invalidation failed ({e})")
+    return len(doomed)
+
+def invalidate_table(table_name):
+    """Drop results that read the given CARR_APMT_EXCL_ADV_yy_yy table."""
+    name = table_name.upper().split(".")[-1]
+    return invalidate([name[len(fy_registry.TABLE_PREFIX):]])
+
+def stats():
+    """Hit/miss counters plus current entry count and bytes held."""
+    with _lock:
+        snapshot = dict(_stats)
+        snapshot["entries"] = len(_entries)
+        snapshot["bytes"] = sum(entry["bytes"] for entry in _entries.values())
+    snapshot["disk"] = disk_cache.stats() if RESULT_CACHE_DISK else {}
+    lookups = snapshot["hits"] + snapshot["disk_hits"] + snapshot["misses"]
+    snapshot["hit_ratio"] = (snapshot["hits"] + snapshot["disk_hits"]) / lookups if lookups else 0.0
+    return snapshot
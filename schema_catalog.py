@@ -0,0 +1,91 @@
+import threading
+import time
+from db_utils import DatabaseConnection, TARGET_SCHEMA
+
+# --- Catalog Settings ---
+# Fiscal-year fact tables: FOISGOODS.CARR_APMT_EXCL_ADV_yy_yy
+TABLE_PATTERN = r"CARR\_APMT\_EXCL\_ADV\_%"
+# Within this many seconds the cached column lists are served without touching the DB.
+# Once it lapses, one cheap ALL_OBJECTS probe decides whether a full reload is needed.
+CATALOG_TTL = 600
+
+# Shared by every Streamlit session in the process
+_lock = threading.Lock()
+_catalog = {
+    "columns": {},        # TABLE_NAME -> [COLUMN_NAME, ...] in COLUMN_ID order
+    "types": {},          # TABLE_NAME -> {COLUMN_NAME: DATA_TYPE}
+    "ddl_signature": None,
+    "checked_at": 0.0,
+}
+
+def _split_name(table_name):
+    """'foisgoods.carr_apmt_excl_adv_24_25' -> ('FOISGOODS', 'CARR_APMT_EXCL_ADV_24_25')"""
+    parts = table_name.upper().split(".")
+    if len(parts) == 2:
+        return parts[0], parts[1]
+    return TARGET_SCHEMA, parts[0]
+
+def _ddl_signature(cursor, owner):
+    # A new, dropped or altered table changes either the count or the latest DDL time
+    cursor.execute("""
+        SELECT COUNT(*), MAX(LAST_DDL_TIME) FROM ALL_OBJECTS
+        WHERE OWNER = :owner AND OBJECT_TYPE = 'TABLE'
+        AND OBJECT_NAME LIKE :pattern ESCAPE '\\'
+    """, owner=owner, pattern=TABLE_PATTERN)
+    return tuple(cursor.fetchone())
+
+def _load_columns(cursor, owner):
+    cursor.execute("""
+        SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE FROM ALL_TAB_COLUMNS
+        WHERE OWNER = :owner AND TABLE_NAME LIKE :pattern ESCAPE '\\'
+        ORDER BY TABLE_NAME, COLUMN_ID
+    """, owner=owner, pattern=TABLE_PATTERN)
+    columns, types = {}, {}
+    for table_name, column_name, data_type in cursor:
+        columns.setdefault(table_name, []).append(column_name)
+        types.setdefault(table_name, {})[column_name] = data_type
+    return columns, types
+
+def _refresh():
+    with _lock:
+        now = time.monotonic()
+        if _catalog["ddl_signature"] is not None and now - _catalog["checked_at"] < CATALOG_TTL:
+            return _catalog["columns"]
+        with DatabaseConnection() as conn:
+            cursor = conn.cursor()
+            signature = _ddl_signature(cursor, TARGET_SCHEMA)
+            if signature != _catalog["ddl_signature"]:
+                _catalog["columns"], _catalog["types"] = _load_columns(cursor, TARGET_SCHEMA)
+                _catalog["ddl_signature"] = signature
+            cursor.close()
+        _catalog["checked_at"] = now
+        return _catalog["columns"]
+
+def columns(table_name):
+    """Column names of a fiscal-year table, in table order ([] if unknown)."""
+    owner, name = _split_name(table_name)
+    if owner != TARGET_SCHEMA:
+        raise ValueError(f"Catalog only covers {TARGET_SCHEMA} tables, got {table_name}")
+    return list(_refresh().get(name, []))
+
+def has_column(table_name, column_name):
+    return column_name.upper() in columns(table_name)
+
+def data_type(table_name, column_name):
+    """Oracle DATA_TYPE of a column (e.g. 'NUMBER', 'VARCHAR2'), or None if unknown."""
+    owner, name = _split_name(table_name)
+    if owner != TARGET_SCHEMA:
+        raise ValueError(f"Catalog only covers {TARGET_SCHEMA} tables, got {table_name}")
+    _refresh()
+    with _lock:
+        return _catalog["types"].get(name, {}).get(column_name.upper())
+
+def tables():
+    """All cached fiscal-year table names (unqualified, upper case)."""
+    return sorted(_refresh())
+
+def invalidate():
+    """Force the next lookup to reload the catalog (e.g. right after running DDL)."""
+    with _lock:
+        _catalog["ddl_signature"] = None
+        _catalog["checked_at"] = 0.0
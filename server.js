@@ -16,27 +16,40 @@ const dbConfig = {
 
 const TARGET_SCHEMA = "FOISGOODS";
 
-// Years data
-const years = ["25_26", "24_25", "23_24", "22_23", "21_22", "20_21", "19_20", "18_19", "17_18"];
-const yearLabels = {
-  "25_26": "2025-26",
-  "24_25": "2024-25",
-  "23_24": "2023-24",
-  "22_23": "2022-23",
-  "21_22": "2021-22",
-  "20_21": "2020-21",
-  "19_20": "2019-20",
-  "18_19": "2018-19",
-  "17_18": "2017-18"
+// Fiscal-year tables (CARR_APMT_EXCL_ADV_yy_yy) discovered from the dictionary,
+// newest first; cached so new years appear without a code change
+const YEARS_TTL_MS = 15 * 60 * 1000;
+let yearsCache = { years: [], yearLabels: {}, loadedAt: 0 };
+
+const loadYears = async (connection) => {
+  if (yearsCache.years.length && Date.now() - yearsCache.loadedAt < YEARS_TTL_MS) {
+    return yearsCache;
+  }
+  const result = await connection.execute(
+    `SELECT TABLE_NAME FROM ALL_TABLES
+     WHERE OWNER = :owner AND TABLE_NAME LIKE 'CARR\\_APMT\\_EXCL\\_ADV\\_%' ESCAPE '\\'`,
+    { owner: TARGET_SCHEMA }
+  );
+  const years = result.rows
+    .map(row => row[0].slice("CARR_APMT_EXCL_ADV_".length))
+    .filter(suffix => /^\d{2}_\d{2}$/.test(suffix))
+    .sort()
+    .reverse();
+  const yearLabels = {};
+  for (const y of years) {
+    yearLabels[y] = `20${y.slice(0, 2)}-${y.slice(3)}`;
+  }
+  yearsCache = { years, yearLabels, loadedAt: Date.now() };
+  return yearsCache;
 };
 
-// SQL queries
-const queries = [
-  "SELECT SUM(CHBL_WGHT) AS SUM_DIFF FROM {schema}.{table} WHERE ZONE_FRM = 'WR'",
-  "SELECT SUM(TOT_FRT_INCL_GST - TOT_GST) AS SUM_DIFF FROM {schema}.{table} WHERE ZONE_FRM = 'WR'",
-  "SELECT SUM(WR) AS SUM_DIFF FROM {schema}.{table} WHERE ZONE_FRM = 'WR'",
-  "SELECT SUM(WR) AS SUM_DIFF FROM {schema}.{table} WHERE ZONE_FRM != 'WR'"
-];
+// Rows 1-4 of the summary in one conditional-aggregation scan per fiscal-year table
+const metricsQuery = `
+  SELECT SUM(CASE WHEN ZONE_FRM = 'WR' THEN CHBL_WGHT ELSE 0 END),
+         SUM(CASE WHEN ZONE_FRM = 'WR' THEN TOT_FRT_INCL_GST - TOT_GST ELSE 0 END),
+         SUM(CASE WHEN ZONE_FRM = 'WR' THEN WR ELSE 0 END),
+         SUM(CASE WHEN ZONE_FRM != 'WR' THEN WR ELSE 0 END)
+  FROM {schema}.{table}`;
 
 // Helper function to calculate percentage variance
 const calculatePctVar = (current, previous) => {
@@ -51,26 +64,22 @@ app.get('/api/traffic-data', async (req, res) => {
   const { selectedYear } = req.query;
   
   try {
+    const connection = await oracledb.getConnection(dbConfig);
+    const { years, yearLabels } = await loadYears(connection);
+
     // Get the index of the selected year
-    const selectedIdx = Object.values(yearLabels).indexOf(selectedYear);
+    const selectedIdx = years.map(y => yearLabels[y]).indexOf(selectedYear);
     // Get the 5 years (selected and previous 4)
     const tableYears = years.slice(selectedIdx, selectedIdx + 5);
     
-    const connection = await oracledb.getConnection(dbConfig);
-    
     const results = [];
     
     for (const year of tableYears) {
       const table = `carr_apmt_excl_adv_${year}`;
-      const rowVals = [];
-      
-      for (const q of queries) {
-        const result = await connection.execute(
-          q.replace('{schema}', TARGET_SCHEMA).replace('{table}', table)
-        );
-        const val = result.rows[0][0] || 0;
-        rowVals.push(val);
-      }
+      const result = await connection.execute(
+        metricsQuery.replace('{schema}', TARGET_SCHEMA).replace('{table}', table)
+      );
+      const rowVals = result.rows[0].map(v => v || 0);
       
       // Calculate derived values
       const [row3, row4] = [rowVals[2], rowVals[3]];
@@ -0,0 +1,54 @@
+import threading
+from concurrent.futures import Future
+
+# --- Single-flight ---
+# While a query with a given key is running, later callers with the same key wait on
+# its Future instead of running it again (e.g. many sessions opening pages4 with the
+# default year/month at once). Keys are the result_cache keys.
+
+_lock = threading.Lock()
+_inflight = {}    # key -> Future
+_stats = {"executions": 0, "coalesced": 0, "failures": 0, "max_waiters": 0}
+_waiters = {}     # key -> callers currently waiting on the in-flight run
+
+def do(key, func):
+    """Run func() once per key at a time. Returns (result, leader).
+
+    leader is False for callers that received another caller's result; they share the
+    same object, so copy it before mutating. Exceptions propagate to every waiter.
+    """
+    with _lock:
+        future = _inflight.get(key)
+        if future is None:
+            future = Future()
+            _inflight[key] = future
+            _stats["executions"] += 1
+            leader = True
+        else:
+            _stats["coalesced"] += 1
+            _waiters[key] = _waiters.get(key, 0) + 1
+            _stats["max_waiters"] = max(_stats["max_waiters"], _waiters[key])
+            leader = False
+    if not leader:
+        return future.result(), False
+    try:
+        result = func()
+    except BaseException as e:
+        with _lock:
+            _stats["failures"] += 1
+            del _inflight[key]
+            _waiters.pop(key, None)
+        future.set_exception(e)
+        raise
+    with _lock:
+        del _inflight[key]
+        _waiters.pop(key, None)
+    future.set_result(result)
+    return result, True
+
+def stats():
+    """executions actually run, coalesced = executions saved, and the largest herd seen."""
+    with _lock:
+        snapshot = dict(_stats)
+        snapshot["in_flight"] = len(_inflight)
+    return snapshot
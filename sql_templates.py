@@ -0,0 +1,116 @@
+import hashlib
+import threading
+import time
+import pandas as pd
+import arrow_fetch
+
+# --- Statement Statistics ---
+# Page SQL is built with Binds, so a dropdown change only changes bind values and the
+# statement text stays identical: the server soft-parses (or the client statement
+# cache skips the parse entirely) instead of hard-parsing a new cursor per selection.
+#
+# Counters are per statement text, process-wide:
+#   executions  - times the statement was run
+#   variants    - distinct bind-value sets seen (each was a distinct SQL text before binds)
+# The client cannot see how the server parsed a statement; server_parse_stats() reads
+# PARSE_CALLS / LOADS (hard parses) from V$SQLAREA for that.
+
+_lock = threading.Lock()
+_stats = {}           # sql_id -> {"sql", "executions", "variants", "total_ms"}
+_variants = {}        # sql_id -> set of bind-value tuples
+
+class Binds:
+    """Collects bind values while a statement is built; placeholders are numbered in call order.
+
+        b = Binds()
+        sql = f"... WHERE yymm BETWEEN {b('201904')} AND {b('202003')}"
+        read_sql(sql, conn, b.values)
+    """
+
+    def __init__(self, prefix="b"):
+        self.prefix = prefix
+        self.values = {}
+
+    def __call__(self, value):
+        name = f"{self.prefix}{len(self.values)}"
+        self.values[name] = value
+        return f":{name}"
+
+    def in_list(self, values):
+        """Comma-separated placeholders for an IN (...) list."""
+        return ", ".join(self(v) for v in values)
+
+def sql_id(sql):
+    """Short stable id for a statement text (whitespace-insensitive)."""
+    return hashlib.sha1(" ".join(sql.split()).encode("utf-8")).hexdigest()[:13]
+
+def _record(sql, params, elapsed_ms):
+    key = sql_id(sql)
+    with _lock:
+        entry = _stats.get(key)
+        if entry is None:
+            entry = _stats[key] = {"sql": " ".join(sql.split())[:120], "executions": 0, "variants": 0, "total_ms": 0.0}
+        entry["executions"] += 1
+        entry["total_ms"] += elapsed_ms
+        variant = tuple(sorted((params or {}).items()))
+        seen_variants = _variants.setdefault(key, set())
+        if variant not in seen_variants:
+            seen_variants.add(variant)
+            entry["variants"] += 1
+
+def read_sql(sql, conn, params=None, profile="aggregate"):
+    """Run a query with bind values, counted against the statement text.
+
+    Oracle connections fetch columnar, sized by the fetch profile (see arrow_fetch);
+    others go through pd.read_sql.
+    """
+    start = time.perf_counter()
+    if arrow_fetch.arrow_supported(conn):
+        df = arrow_fetch.read_df(sql, conn, params, profile)
+    else:
+        df = pd.read_sql(sql, con=conn, params=params or None)
+    _record(sql, params, (time.perf_counter() - start) * 1000)
+    return df
+
+def execute(cursor, sql, params=None, profile=None):
+    """cursor.execute with bind values, counted against the statement text.
+
+    profile ("aggregate", "preview", "bulk") sizes the cursor's fetches (see arrow_fetch).
+    """
+    if profile is not None:
+        arrow_fetch.configure(cursor, profile, sql)
+    start = time.perf_counter()
+    cursor.execute(sql, params or {})
+    _record(sql, params, (time.perf_counter() - start) * 1000)
+    return cursor
+
+def statement_stats():
+    """Per-statement counters, most executed first."""
+    with _lock:
+        rows = [dict(entry, sql_id=key) for key, entry in _stats.items()]
+    return sorted(rows, key=lambda r: r["executions"], reverse=True)
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+        _variants.clear()
+
+def server_parse_stats(conn, module=None):
+    """Parse/execute counts from V$SQLAREA for this application's statements.
+
+    LOADS counts hard parses; soft_ratio is the share of parse calls that reused a
+    cursor. Needs SELECT on V$SQLAREA; returns None without it.
+    """
+    from db_utils import APP_MODULE
+    try:
+        df = pd.read_sql("""
+            SELECT sql_id, parse_calls, executions, loads, SUBSTR(sql_text, 1, 120) AS sql_text
+            FROM v$sqlarea
+            WHERE module = :module
+            ORDER BY executions DESC
+        """, con=conn, params={"module": module or APP_MODULE})
+    except Exception:
+        return None
+    df.columns = [c.lower() for c in df.columns]
+    df["soft_ratio"] = 1 - df["loads"] / df["parse_calls"].where(df["parse_calls"] > 0)
+    return df
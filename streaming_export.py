@@ -0,0 +1,171 @@
+import io
+import os
+import time
+
+# --- Streaming Export ---
+# Exports consume fetched batches and write them to a file (a job result, see jobs) as
+# they arrive, so memory stays at about one batch whatever the size of the export (one
+# row group for Parquet). Excel and CSV take DataFrames (arrow_fetch.iter_batches);
+# Parquet and Arrow IPC take the driver's Arrow tables as they are
+# (arrow_fetch.iter_arrow_batches), with no pandas round trip. Excel is by far the
+# slowest target; CSV (gzip/zstd), Parquet and Arrow IPC write a full fiscal year in a
+# fraction of the time and size. Parquet and Arrow need pyarrow; zstd CSV needs zstandard.
+
+# Excel's hard limit per sheet, header row included
+EXCEL_MAX_ROWS = 1_048_576
+# Parquet row groups: batches are buffered up to this many rows before a group is written
+PARQUET_ROW_GROUP_ROWS = int(os.getenv("PARQUET_ROW_GROUP_ROWS", 500_000))
+
+def _cells(batch):
+    # NaN/NaT would be written as invalid numbers; Excel wants empty cells
+    return batch.astype(object).where(batch.notna(), None).itertuples(index=False, name=None)
+
+def write_xlsx(batches, path, sheet_name="Data", progress=None):
+    """Write batches to an .xlsx file with openpyxl's write-only (streaming) workbook.
+
+    A new sheet ("Data", "Data_2", ...) starts whenever one reaches Excel's row limit.
+    progress(rows_written) is called after every batch. Returns export stats.
+    """
+    from openpyxl import Workbook
+    start = time.perf_counter()
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows, sheets, rows, header = None, 0, 0, 0, None
+    for batch in batches:
+        if header is None:
+            header = [str(col) for col in batch.columns]
+        for row in _cells(batch):
+            if sheet is None or sheet_rows >= EXCEL_MAX_ROWS:
+                sheets += 1
+                sheet = workbook.create_sheet(sheet_name if sheets == 1 else f"{sheet_name}_{sheets}")
+                sheet.append(header)
+                sheet_rows = 1
+            sheet.append(row)
+            sheet_rows += 1
+            rows += 1
+        if progress is not None:
+            progress(rows)
+    if sheet is None:
+        # Empty export: still a valid workbook with the header, if there was one
+        workbook.create_sheet(sheet_name).append(header or [])
+        sheets = 1
+    workbook.save(path)
+    return _stats(path, rows, sheets, time.perf_counter() - start)
+
+# ------------------- CSV / Parquet / Arrow -------------------
+
+def _open_text(path, compression):
+    if compression == "gzip":
+        import gzip
+        return gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=6)
+    if compression == "zstd":
+        import zstandard
+        raw = open(path, "wb")
+        return io.TextIOWrapper(zstandard.ZstdCompressor(level=3).stream_writer(raw), encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+def write_csv(batches, path, compression=None, progress=None):
+    """CSV, optionally gzip or zstd compressed (zstd needs the zstandard package)."""
+    start = time.perf_counter()
+    rows, header = 0, True
+    with _open_text(path, compression) as f:
+        for batch in batches:
+            if batch.empty and not header:
+                continue
+            batch.to_csv(f, header=header, index=False)
+            header = False
+            rows += len(batch)
+            if progress is not None:
+                progress(rows)
+    return _stats(path, rows, 1, time.perf_counter() - start)
+
+def _arrow_tables(tables, progress):
+    """Arrow tables with progress reporting; all must share the first one's schema."""
+    schema, rows = None, 0
+    for table in tables:
+        if schema is None:
+            schema = table.schema
+        elif not table.schema.equals(schema):
+            # The fetch types columns from metadata, so this only reconciles e.g. string widths
+            table = table.cast(schema)
+        rows += table.num_rows
+        if progress is not None:
+            progress(rows)
+        yield table
+
+def write_parquet(batches, path, progress=None):
+    """Parquet (zstd) from Arrow tables, with row groups of about PARQUET_ROW_GROUP_ROWS rows."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    start = time.perf_counter()
+    writer, pending, pending_rows, rows, groups = None, [], 0, 0, 0
+    try:
+        for table in _arrow_tables(batches, progress):
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression="zstd")
+            pending.append(table)
+            pending_rows += table.num_rows
+            rows += table.num_rows
+            if pending_rows >= PARQUET_ROW_GROUP_ROWS:
+                writer.write_table(pa.concat_tables(pending), row_group_size=pending_rows)
+                pending, pending_rows, groups = [], 0, groups + 1
+        if writer is not None and pending:
+            writer.write_table(pa.concat_tables(pending), row_group_size=max(pending_rows, 1))
+            groups += 1
+    finally:
+        if writer is not None:
+            writer.close()
+    return _stats(path, rows, groups, time.perf_counter() - start)
+
+def write_arrow(batches, path, progress=None):
+    """Arrow IPC file (Feather v2) from Arrow tables, one record batch per fetched batch."""
+    import pyarrow as pa
+    start = time.perf_counter()
+    writer, rows, parts = None, 0, 0
+    with pa.OSFile(path, "wb") as sink:
+        try:
+            for table in _arrow_tables(batches, progress):
+                if writer is None:
+                    writer = pa.ipc.new_file(sink, table.schema)
+                writer.write_table(table)
+                rows += table.num_rows
+                parts += 1
+        finally:
+            if writer is not None:
+                writer.close()
+    return _stats(path, rows, parts, time.perf_counter() - start)
+
+# Format key -> file suffix, MIME type, writer(batches, path, progress) and whether the
+# writer takes Arrow tables rather than DataFrames (see fetch_batches)
+EXPORT_FORMATS = {
+    "xlsx": {"label": "Excel (.xlsx)", "suffix": ".xlsx", "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "writer": write_xlsx},
+    "csv": {"label": "CSV", "suffix": ".csv", "mime": "text/csv", "writer": write_csv},
+    "csv.gz": {"label": "CSV (gzip)", "suffix": ".csv.gz", "mime": "application/gzip", "writer": lambda b, p, progress=None: write_csv(b, p, "gzip", progress)},
+    "csv.zst": {"label": "CSV (zstd)", "suffix": ".csv.zst", "mime": "application/zstd", "writer": lambda b, p, progress=None: write_csv(b, p, "zstd", progress)},
+    "parquet": {"label": "Parquet", "suffix": ".parquet", "mime": "application/vnd.apache.parquet", "writer": write_parquet, "arrow": True},
+    "arrow": {"label": "Arrow IPC (.arrow)", "suffix": ".arrow", "mime": "application/vnd.apache.arrow.file", "writer": write_arrow, "arrow": True},
+}
+
+def fetch_batches(fmt, sql, conn, params=None):
+    """Batches of a query in the form fmt's writer takes."""
+    import arrow_fetch
+    fetch = arrow_fetch.iter_arrow_batches if EXPORT_FORMATS[fmt].get("arrow") else arrow_fetch.iter_batches
+    return fetch(sql, conn, params, profile="bulk")
+
+def write(fmt, batches, path, progress=None):
+    """Write batches (see fetch_batches) in one of EXPORT_FORMATS; returns export stats."""
+    return EXPORT_FORMATS[fmt]["writer"](batches, path, progress=progress)
+
+def _stats(path, rows, parts, seconds):
+    return {
+        "path": path,
+        "rows": rows,
+        "parts": parts,
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds else 0.0,
+        # An empty Arrow fetch may yield no batch at all, leaving no file behind
+        "bytes": os.path.getsize(path) if os.path.exists(path) else 0,
+    }
+
+def format_stats(stats):
+    return (f"{stats['rows']:,} rows in {stats['seconds']:.1f}s "
+            f"({stats['rows_per_sec']:,.0f} rows/s, {stats['bytes'] / 1024 / 1024:.1f} MB)")
@@ -1,38 +1,18 @@
-import oracledb
 from datetime import datetime
+from db_utils import get_db_connection
 
-# --- Oracle Instant Client Configuration ---
-INSTANT_CLIENT_PATH = r"C:\Users\PC\Downloads\instantclient-basic-windows.x64-23.8.0.25.04\instantclient_23_8"
-
-# --- Database Connection Parameters ---
-DB_USER = "intern"
-DB_PASSWORD = "inT##2025"
-DB_HOST = "10.3.19.4"
-DB_PORT = 1523
-DB_SID = "traffic"
-DSN = f"{DB_HOST}:{DB_PORT}/{DB_SID}"
-
-# --- Table/Schema ---
-TARGET_SCHEMA = "FOISGOODS"
 
 def create_table():
-    # Initialize Oracle client (if needed)
-    oracledb.init_oracle_client(lib_dir=INSTANT_CLIENT_PATH)
-    
     try:
-        # Connect to Oracle (replace with your credentials)
-        connection = oracledb.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            dsn=DSN
-        )
+        # Pooled connection (Oracle client is initialised by db_utils)
+        connection = get_db_connection()
         
         cursor = connection.cursor()
         table_name = "DATA_STORE"
         # Only create table and sequence if they do not exist
-        cursor.execute(f"""
-            SELECT table_name FROM user_tables WHERE table_name = UPPER('{table_name}')
-        """)
+        cursor.execute("""
+            SELECT table_name FROM user_tables WHERE table_name = UPPER(:table_name)
+        """, table_name=table_name)
         if not cursor.fetchone():
             cursor.execute(f"""
                 CREATE TABLE {table_name} (